@@ -10,29 +10,42 @@ import xml.etree.ElementTree as ET
 from concurrent.futures import ThreadPoolExecutor
 import os
 import requests
-import hmac
-import hashlib
-import json
+import uuid
+from order_book import OrderBookManager, RestDepthSource, BinanceDiffStream
+from order_gateway import OrderGateway
+from paging import PageCache, page_bounds, csv_export
+from bar_store import BarStore
+from nse_calendar import NSECalendar, IST
+from crypto_quotes import HedgedQuotes
+from cache_layer import swr_cache, single_flight, invalidate_tier, cache_stats
+from journal_analytics import JournalAnalytics, summarize
+from market_replay import install_from_env, market_now, Player
+from profiler import SamplingProfiler
+from risk_engine import position_risk, build_positions, portfolio_risk
+from strategies import IndicatorCache, IndicatorFrame, STRATEGIES, strategies_for, latest_signal, backtest
+from signal_bus import EventBus, WebhookNotifier, describe_event, TOPIC_JOURNAL, TOPIC_SIGNAL, TOPIC_TRADE_OPEN, TOPIC_TRADE_CLOSE
+from trade_tracker import TradeBook, TradeTracker, Journal, SignalMonitor
+from volume_spike import VolumeSpikeDetector
 
 # --- 1. Page Configuration & Session State ---
 st.set_page_config(layout="wide", page_title="Haridas Master Terminal", initial_sidebar_state="expanded")
 
-ACTIVE_TRADES_FILE = "active_trades.csv"
-HISTORY_TRADES_FILE = "trade_history.csv"
+# HARIDAS_RECORD / HARIDAS_REPLAY route yfinance + exchange calls through market_replay
+market_source = install_from_env()
 
-def load_data(file_name):
-    if os.path.exists(file_name):
-        try: return pd.read_csv(file_name).to_dict('records')
-        except: return []
-    return []
+PROFILED_FUNCS = ["fetch_coindcx_api", "fetch_all_crypto", "fetch_live_data", "get_crypto_trends", "calc_sector_perf", "calc_market_breadth",
+                  "calc_dynamic_movers", "run_nse_strategy", "run_crypto_strategy", "process_auto_trades", "scan_pre_market", "scan_open_movers", "scan_oi_setup"]
+run_profiler = None
+# A run cut short by st.rerun/st.stop/an exception never reaches the stop at the bottom
+if st.session_state.get("active_profiler") is not None: st.session_state.pop("active_profiler").stop()
+if os.environ.get("HARIDAS_PROFILE") == "1" or st.session_state.get("profile_run", False):
+    run_profiler = st.session_state.active_profiler = SamplingProfiler(tracked=PROFILED_FUNCS).start()
 
-def save_data(data, file_name):
-    pd.DataFrame(data).to_csv(file_name, index=False)
+ACTIVE_TRADES_FILE = "active_trades.csv"
+HISTORY_TRADES_FILE = "trade_history.csv"
+JOURNAL_STATS_FILE = "journal_stats.json"
+NSE_EOD_FILE = "nse_eod_bars.pkl"
 
-if 'active_trades' not in st.session_state:
-    st.session_state.active_trades = load_data(ACTIVE_TRADES_FILE)
-if 'trade_history' not in st.session_state:
-    st.session_state.trade_history = load_data(HISTORY_TRADES_FILE)
 if 'auto_ref' not in st.session_state:
     st.session_state.auto_ref = False
 
@@ -63,6 +76,12 @@ CRYPTO_SECTORS = {
 ALL_STOCKS = list(set([stock for slist in FNO_SECTORS.values() for stock in slist] + NIFTY_50 + st.session_state.custom_watch_in))
 ALL_CRYPTO = list(set([coin for clist in CRYPTO_SECTORS.values() for coin in clist] + st.session_state.custom_watch_cr))
 
+SECTOR_OF = {stock: sector for sector, slist in FNO_SECTORS.items() if sector != "MIXED WATCHLIST" for stock in slist}
+
+def sector_of(ticker):
+    if "-USD" in ticker: return "CRYPTO"
+    return SECTOR_OF.get(ticker, "OTHER")
+
 def fmt_price(val, is_crypto=False):
     try:
         val = float(val)
@@ -91,42 +110,63 @@ def get_tv_link(ticker, market_mode):
         return f"https://in.tradingview.com/chart/?symbol={sym}"
 
 # --- 3. HELPER FUNCTIONS ---
-@st.cache_data(ttl=15, show_spinner=False)
+@st.cache_resource(show_spinner=False)
+def get_nse_calendar():
+    return NSECalendar(clock=lambda: market_now(IST))
+
+@st.cache_resource(show_spinner=False)
+def get_bar_stores():
+    # NSE: 5m base -> 15m / 1h / 1d, crypto: 1h base -> 1d (Backtest's long periods still fetch directly)
+    # NSE bars freeze after the close and are served from the EOD snapshot until the next pre-open
+    nse = BarStore("5m", warm_period="10d", refresh_period="1d", max_age=15, keep_days=10, session_offset="15min",
+                   calendar=get_nse_calendar(), snapshot_file=NSE_EOD_FILE)
+    crypto = BarStore("1h", warm_period="15d", refresh_period="1d", max_age=15, keep_days=15, clock=lambda: market_now(pytz.utc))
+    # Everything else (USDINR) trades on its own hours: no NSE calendar, days as Yahoo dates them
+    other = BarStore("5m", warm_period="10d", refresh_period="1d", max_age=15, keep_days=10, clock=lambda: market_now(pytz.utc))
+    return nse, crypto, other
+
+NSE_INDICES = ("^NSEI", "^NSEBANK", "^BSESN")
+
+def is_nse_instrument(ticker):
+    return ticker.endswith(".NS") or ticker in NSE_INDICES or ticker.startswith("^CNX")
+
+def get_bars(ticker, interval=None, days=None):
+    nse_store, crypto_store, other_store = get_bar_stores()
+    store = crypto_store if "-USD" in ticker else nse_store if is_nse_instrument(ticker) else other_store
+    return store.bars(ticker, interval, days)
+
+@st.cache_resource(show_spinner=False)
+def get_indicator_cache():
+    return IndicatorCache()
+
+def get_indicators(ticker, interval=None, days=None):
+    # Shared SMA/BB/HA/trend columns for every scanner reading these bars
+    return get_indicator_cache().get((ticker, interval, days), get_bars(ticker, interval, days))
+
+TREND_STATUS = {1: ("৩ দিন উত্থান", "green"), -1: ("৩ দিন পতন", "red")}
+
+def trend_status(frame):
+    if len(frame) < 3: return None
+    return TREND_STATUS.get(int(frame['Trend_3'].iloc[-1]))
+
+def scan_symbol(symbol, market, sentiment):
+    # First registered strategy for the market that fires on the last completed bar
+    for strat in strategies_for(market):
+        sig = latest_signal(strat, get_indicators(symbol, strat.interval, strat.days), sentiment)
+        if sig: return {"Stock": symbol, **sig}
+    return None
+
+@st.cache_resource(show_spinner=False)
+def get_quote_sources():
+    return HedgedQuotes()
+
+@st.cache_data(ttl=15, max_entries=1, show_spinner=False)
 def fetch_coindcx_api():
-    try:
-        res = requests.get("https://api.coindcx.com/exchange/ticker", timeout=5).json()
-        ticker_dict = {}
-        if isinstance(res, list) and len(res) > 0:
-            for item in res:
-                market = str(item.get('market', ''))
-                if market.endswith('USDT'):
-                    base = market.replace('B-', '').replace('_USDT', '').replace('USDT', '')
-                    if base:
-                        sym = f"{base}-USD"
-                        ticker_dict[sym] = {
-                            "last_price": float(item.get('last_price', 0)),
-                            "change_pct": float(item.get('change_24_hour', 0))
-                        }
-            if len(ticker_dict) > 50: return ticker_dict
-    except: pass
-    
-    try:
-        res = requests.get("https://api.binance.com/api/v3/ticker/24hr", timeout=5).json()
-        if isinstance(res, list):
-            for item in res:
-                symbol = str(item.get('symbol', ''))
-                if symbol.endswith('USDT'):
-                    base = symbol.replace('USDT', '')
-                    if base:
-                        sym = f"{base}-USD"
-                        ticker_dict[sym] = {
-                            "last_price": float(item.get('lastPrice', 0)),
-                            "change_pct": float(item.get('priceChangePercent', 0))
-                        }
-    except: pass
-    return ticker_dict
-
-@st.cache_data(ttl=15, show_spinner=False)
+    # CoinDCX first, Binance hedged in if it hasn't answered within 0.4s; first complete answer wins
+    try: return get_quote_sources().fetch()
+    except: return {}
+
+@st.cache_data(ttl=15, max_entries=1, show_spinner=False)
 def fetch_all_crypto():
     data_dict = fetch_coindcx_api()
     if not data_dict: return pd.DataFrame()
@@ -139,7 +179,7 @@ def fetch_all_crypto():
         })
     return pd.DataFrame(df_data).sort_values(by="Change %", ascending=False)
 
-@st.cache_data(ttl=15, show_spinner=False)
+@st.cache_data(ttl=15, max_entries=1000, show_spinner=False)
 def fetch_live_data(ticker_symbol, is_crypto=False):
     try:
         if is_crypto:
@@ -154,7 +194,7 @@ def fetch_live_data(ticker_symbol, is_crypto=False):
                 return (ltp, chg, pct)
             else:
                 try:
-                    df = yf.Ticker(ticker_symbol).history(period="5d")
+                    df = get_bars(ticker_symbol, "1d", days=5)
                     if len(df) >= 2:
                         prev = float(df['Close'].iloc[-2])
                         ltp = float(df['Close'].iloc[-1])
@@ -163,14 +203,10 @@ def fetch_live_data(ticker_symbol, is_crypto=False):
                 return (0.0, 0.0, 0.0) 
         else:
             try:
-                stock = yf.Ticker(ticker_symbol)
-                df_daily = stock.history(period='5d', interval='1d')
+                df_daily = get_bars(ticker_symbol, "1d", days=5)
                 if len(df_daily) >= 2:
                     prev_close = float(df_daily['Close'].iloc[-2])
-                    try: 
-                        fast_ltp = float(stock.fast_info.last_price)
-                        ltp = fast_ltp if fast_ltp > 0 else float(df_daily['Close'].iloc[-1])
-                    except: ltp = float(df_daily['Close'].iloc[-1])
+                    ltp = float(df_daily['Close'].iloc[-1])  # close of the latest 5m bar
                     
                     if prev_close > 0 and ltp > 0:
                         change = ltp - prev_close
@@ -180,32 +216,32 @@ def fetch_live_data(ticker_symbol, is_crypto=False):
             except: return (0.0, 0.0, 0.0)
     except: return (0.0, 0.0, 0.0)
 
-@st.cache_data(ttl=120, show_spinner=False)
+# Uncached upstream calls: concurrent callers for the same arguments share one request
+@single_flight
+def fetch_binance_klines(ticker, interval="1d", limit=3):
+    symbol = ticker.replace('-USD', 'USDT')
+    return requests.get(f"https://api.binance.com/api/v3/klines?symbol={symbol}&interval={interval}&limit={limit}", timeout=2).json()
+
+@single_flight
+def fetch_history(ticker, period):
+    return yf.Ticker(ticker).history(period=period)
+
+@swr_cache(ttl=120)
 def get_crypto_trends(item_list):
     def fetch_trend(ticker):
         try:
-            df = yf.Ticker(ticker).history(period="5d", interval="1d")
-            if len(df) >= 3:
-                c1, o1 = float(df['Close'].iloc[-1]), float(df['Open'].iloc[-1])
-                c2, o2 = float(df['Close'].iloc[-2]), float(df['Open'].iloc[-2])
-                c3, o3 = float(df['Close'].iloc[-3]), float(df['Open'].iloc[-3])
-
-                if c1 > o1 and c2 > o2 and c3 > o3: return {"Stock": ticker, "Status": "৩ দিন উত্থান", "Color": "green"}
-                elif c1 < o1 and c2 < o2 and c3 < o3: return {"Stock": ticker, "Status": "৩ দিন পতন", "Color": "red"}
-                return None
+            frame = get_indicators(ticker, "1d", days=5)
+            if len(frame) >= 3:
+                trend = trend_status(frame)
+                return {"Stock": ticker, "Status": trend[0], "Color": trend[1]} if trend else None
         except: pass
         
         try:
-            symbol = ticker.replace('-USD', 'USDT')
-            url = f"https://api.binance.com/api/v3/klines?symbol={symbol}&interval=1d&limit=3"
-            res = requests.get(url, timeout=2).json()
+            res = fetch_binance_klines(ticker)
             if len(res) >= 3:
-                o3, c3 = float(res[0][1]), float(res[0][4])
-                o2, c2 = float(res[1][1]), float(res[1][4])
-                o1, c1 = float(res[2][1]), float(res[2][4])
-
-                if c1 > o1 and c2 > o2 and c3 > o3: return {"Stock": ticker, "Status": "৩ দিন উত্থান", "Color": "green"}
-                elif c1 < o1 and c2 < o2 and c3 < o3: return {"Stock": ticker, "Status": "৩ দিন পতন", "Color": "red"}
+                klines = pd.DataFrame({"Open": [float(k[1]) for k in res], "Close": [float(k[4]) for k in res]})
+                trend = trend_status(IndicatorFrame(klines))
+                if trend: return {"Stock": ticker, "Status": trend[0], "Color": trend[1]}
         except: pass
         return None
 
@@ -213,7 +249,7 @@ def get_crypto_trends(item_list):
         results = list(executor.map(fetch_trend, item_list))
     return [r for r in results if r]
 
-@st.cache_data(ttl=60, show_spinner=False)
+@swr_cache(ttl=60)
 def calc_sector_perf(sector_dict, ignore_keys=[], is_crypto=False):
     results = []
     for sector, items in sector_dict.items():
@@ -234,7 +270,7 @@ def calc_sector_perf(sector_dict, ignore_keys=[], is_crypto=False):
             results.append({"Sector": sector, "Pct": avg_pct, "Width": max(min(abs(avg_pct) * 20, 100), 5), "Stocks": stock_details})
     return sorted(results, key=lambda x: x['Pct'], reverse=True)
 
-@st.cache_data(ttl=60, show_spinner=False)
+@swr_cache(ttl=60)
 def calc_market_breadth(item_list, is_crypto=False):
     adv, dec = 0, 0
     def fetch_chg(ticker): 
@@ -249,7 +285,7 @@ def calc_market_breadth(item_list, is_crypto=False):
         elif pct < 0: dec += 1
     return adv, dec
 
-@st.cache_data(ttl=120, show_spinner=False)
+@swr_cache(ttl=120)
 def calc_dynamic_movers(item_list, is_crypto=False):
     gainers, losers, trends = [], [], []
     def fetch_data(ticker):
@@ -260,13 +296,9 @@ def calc_dynamic_movers(item_list, is_crypto=False):
             
             status, color = None, None
             if not is_crypto:
-                df = yf.Ticker(ticker).history(period="10d", interval="1d")
-                if len(df) >= 3:
-                    c1 = ltp 
-                    c2, c3 = float(df['Close'].iloc[-2]), float(df['Close'].iloc[-3])
-                    o1, o2, o3 = float(df['Open'].iloc[-1]), float(df['Open'].iloc[-2]), float(df['Open'].iloc[-3])
-                    if c1 > o1 and c2 > o2 and c3 > o3: status, color = "৩ দিন উত্থান", "green"
-                    elif c1 < o1 and c2 < o2 and c3 < o3: status, color = "৩ দিন পতন", "red"
+                # Today's daily bar closes at the latest 5m bar, i.e. at the LTP
+                trend = trend_status(get_indicators(ticker, "1d", days=10))
+                if trend: status, color = trend
                 
             obj = {"Stock": ticker, "LTP": ltp, "Pct": round(pct_chg, 2)}
             return (obj, status, color)
@@ -284,159 +316,68 @@ def calc_dynamic_movers(item_list, is_crypto=False):
             
     return sorted(gainers, key=lambda x: x['Pct'], reverse=True)[:5], sorted(losers, key=lambda x: x['Pct'])[:5], trends
 
-@st.cache_data(ttl=60, show_spinner=False)
+@swr_cache(ttl=60)
 def run_nse_strategy(stock_list, sentiment="BOTH"):
     signals = []
     for stock_symbol in stock_list:
         try:
-            df = yf.Ticker(stock_symbol).history(period="5d", interval="5m") 
-            if df.empty or len(df) < 25: continue
-            df['SMA_20'] = df['Close'].rolling(window=20).mean()
-            df['STD_20'] = df['Close'].rolling(window=20).std()
-            df['Upper_BB'] = df['SMA_20'] + (2 * df['STD_20'])
-            df['Lower_BB'] = df['SMA_20'] - (2 * df['STD_20'])
-            df['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-            ha_open = [df['Open'].iloc[0]]
-            for i in range(1, len(df)): ha_open.append((ha_open[i-1] + df['HA_Close'].iloc[i-1]) / 2)
-            df['HA_Open'] = ha_open
-            df['HA_High'] = df[['High', 'HA_Open', 'HA_Close']].max(axis=1)
-            df['HA_Low'] = df[['Low', 'HA_Open', 'HA_Close']].min(axis=1)
-            df = df.dropna()
-            if len(df) < 3: continue
-            
-            completed_idx = len(df) - 2
-            alert_candle, prev_candle, current_ltp = df.iloc[completed_idx], df.iloc[completed_idx - 1], df['Close'].iloc[-1]
-            signal = None
-            entry = sl = target_bb = 0.0
-            
-            if (prev_candle['HA_High'] >= prev_candle['Upper_BB']) and (alert_candle['HA_Close'] < alert_candle['HA_Open']) and (alert_candle['HA_High'] < alert_candle['Upper_BB']):
-                signal, entry, sl, target_bb = "SHORT", alert_candle['Low'] - 0.10, alert_candle['High'] + 0.10, alert_candle['Lower_BB']
-            elif (prev_candle['HA_Low'] <= prev_candle['Lower_BB']) and (alert_candle['HA_Close'] > alert_candle['HA_Open']) and (alert_candle['HA_Low'] > alert_candle['Lower_BB']):
-                signal, entry, sl, target_bb = "BUY", alert_candle['High'] + 0.10, alert_candle['Low'] - 0.10, alert_candle['Upper_BB']
-                
-            if sentiment == "BULLISH" and signal == "SHORT": continue
-            if sentiment == "BEARISH" and signal == "BUY": continue
-
-            if signal:
-                risk = abs(entry - sl)
-                if risk > 0:
-                    signals.append({
-                        "Stock": stock_symbol, "Entry": float(entry), "LTP": float(current_ltp),
-                        "Signal": signal, "SL": float(sl), "Target(BB)": float(target_bb), 
-                        "T2(1:3)": float(entry - (risk*3) if signal=="SHORT" else entry + (risk*3)),
-                        "Time": alert_candle.name.strftime('%H:%M')
-                    })
+            sig = scan_symbol(stock_symbol, "NSE", sentiment)
+            if sig: signals.append(sig)
         except: continue
     return signals
 
-@st.cache_data(ttl=60, show_spinner=False)
+@swr_cache(ttl=60)
 def run_crypto_strategy(crypto_list, sentiment="BOTH"):
-    signals = []
     def scan_coin(coin):
-        try:
-            df = yf.Ticker(coin).history(period="15d", interval="1h") 
-            if df.empty or len(df) < 25: return None
-            df['SMA_20'] = df['Close'].rolling(window=20).mean()
-            df['STD_20'] = df['Close'].rolling(window=20).std()
-            df['Upper_BB'] = df['SMA_20'] + (2 * df['STD_20'])
-            df['Lower_BB'] = df['SMA_20'] - (2 * df['STD_20'])
-            df['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-            ha_open = [df['Open'].iloc[0]]
-            for i in range(1, len(df)): ha_open.append((ha_open[i-1] + df['HA_Close'].iloc[i-1]) / 2)
-            df['HA_Open'] = ha_open
-            df['HA_High'] = df[['High', 'HA_Open', 'HA_Close']].max(axis=1)
-            df['HA_Low'] = df[['Low', 'HA_Open', 'HA_Close']].min(axis=1)
-            df = df.dropna()
-            if len(df) < 3: return None
-            
-            completed_idx = len(df) - 2
-            alert_candle, prev_candle, current_ltp = df.iloc[completed_idx], df.iloc[completed_idx - 1], df['Close'].iloc[-1]
-            signal = None
-            entry = sl = target_bb = 0.0
-            buffer = alert_candle['Close'] * 0.001 
-            
-            if (prev_candle['HA_High'] >= prev_candle['Upper_BB']) and (alert_candle['HA_High'] < alert_candle['Upper_BB']):
-                signal, entry, sl, target_bb = "SHORT", alert_candle['Low'] - buffer, alert_candle['High'] + buffer, alert_candle['Lower_BB']
-            elif (prev_candle['HA_Low'] <= prev_candle['Lower_BB']) and (alert_candle['HA_Low'] > alert_candle['Lower_BB']):
-                signal, entry, sl, target_bb = "BUY", alert_candle['High'] + buffer, alert_candle['Low'] - buffer, alert_candle['Upper_BB']
-                
-            if sentiment == "BULLISH" and signal == "SHORT": return None
-            if sentiment == "BEARISH" and signal == "BUY": return None
-
-            if signal:
-                risk = abs(entry - sl)
-                if risk > 0:
-                    return {
-                        "Stock": coin, "Signal": signal, "Entry": float(entry), "LTP": float(current_ltp),
-                        "SL": float(sl), "Target(BB)": float(target_bb), "T2(1:3)": float(entry - (risk*3) if signal=="SHORT" else entry + (risk*3)),
-                        "Time": alert_candle.name.strftime('%d %b, %H:%M')
-                    }
+        try: return scan_symbol(coin, "CRYPTO", sentiment)
         except: return None
-        return None
 
     with ThreadPoolExecutor(max_workers=30) as executor:
         results = list(executor.map(scan_coin, crypto_list))
-    for res in results:
-        if res is not None: signals.append(res)
-    return signals
-
-def process_auto_trades(live_signals, is_crypto_mode):
-    ist_timezone = pytz.timezone('Asia/Kolkata')
-    current_time_str = datetime.datetime.now(ist_timezone).strftime("%Y-%m-%d %H:%M")
-    active_stocks = [t['Stock'] for t in st.session_state.active_trades]
-
-    for sig in live_signals:
-        if sig['Stock'] not in active_stocks:
-            is_triggered = False
-            if sig['Signal'] == 'BUY' and sig['LTP'] >= sig['Entry']: is_triggered = True
-            elif sig['Signal'] == 'SHORT' and sig['LTP'] <= sig['Entry']: is_triggered = True
-            
-            if is_triggered:
-                new_trade = {
-                    "Date": current_time_str, "Stock": sig['Stock'], "Signal": sig['Signal'],
-                    "Entry": float(sig['Entry']), "SL": float(sig['SL']), "Target": float(sig['T2(1:3)']), "Status": "RUNNING"
-                }
-                st.session_state.active_trades.append(new_trade)
-                save_data(st.session_state.active_trades, ACTIVE_TRADES_FILE)
-
-    trades_to_remove = []
-    for trade in st.session_state.active_trades:
-        res = fetch_live_data(trade['Stock'], is_crypto_mode)
-        ltp = res[0]
-        if ltp == 0.0: continue
-
-        close_reason = None
-        exit_price = 0.0
-
-        if trade['Signal'] == 'BUY':
-            if ltp <= float(trade['SL']): close_reason, exit_price = "🛑 SL HIT", trade['SL']
-            elif ltp >= float(trade['Target']): close_reason, exit_price = "🎯 TARGET HIT", trade['Target']
-        elif trade['Signal'] == 'SHORT':
-            if ltp >= float(trade['SL']): close_reason, exit_price = "🛑 SL HIT", trade['SL']
-            elif ltp <= float(trade['Target']): close_reason, exit_price = "🎯 TARGET HIT", trade['Target']
-
-        if close_reason:
-            pnl_pct = ((exit_price - trade['Entry']) / trade['Entry']) * 100 if trade['Signal'] == 'BUY' else ((trade['Entry'] - exit_price) / trade['Entry']) * 100
-            completed_trade = {
-                "Date": current_time_str, "Stock": trade['Stock'], "Signal": trade['Signal'],
-                "Entry": trade['Entry'], "Exit": exit_price, "Status": close_reason, "P&L %": round(pnl_pct, 2)
-            }
-            st.session_state.trade_history.append(completed_trade)
-            trades_to_remove.append(trade)
-
-    if trades_to_remove:
-        st.session_state.active_trades = [t for t in st.session_state.active_trades if t not in trades_to_remove]
-        save_data(st.session_state.active_trades, ACTIVE_TRADES_FILE)
-        save_data(st.session_state.trade_history, HISTORY_TRADES_FILE)
-
-@st.cache_data(ttl=60, show_spinner=False)
+    return [res for res in results if res is not None]
+
+def live_ltp(ticker):
+    return fetch_live_data(ticker, "-USD" in ticker)[0]
+
+@st.cache_resource(show_spinner=False)
+def get_order_books():
+    books = OrderBookManager(RestDepthSource(), depth=20)
+    # Live diffs only against the real exchange; record/replay runs go through REST snapshots
+    if market_source is None: books.stream = BinanceDiffStream(books.apply)
+    return books
+
+def book_touch(ticker):
+    return get_order_books().touch(ticker) if "-USD" in ticker else None
+
+@st.cache_resource(show_spinner=False)
+def get_trade_engine():
+    bus = EventBus()
+    book = TradeBook(ACTIVE_TRADES_FILE, HISTORY_TRADES_FILE)
+    tracker = TradeTracker(bus, book, touch=book_touch)
+    analytics = JournalAnalytics(sector_of, JOURNAL_STATS_FILE)
+    analytics.sync(book.history)
+    Journal(bus, book, analytics)
+    WebhookNotifier().attach(bus)
+    monitor = SignalMonitor(bus, tracker, live_ltp).start()
+    return bus, book, tracker, monitor, analytics
+
+def process_auto_trades(live_signals, watch_key, scan_fn):
+    monitor.watch(watch_key, scan_fn)
+    monitor.ingest(watch_key, live_signals)
+    tracker.on_quotes(live_ltp)
+
+@swr_cache(ttl=60)
 def scan_pre_market(stock_list):
     movers = []
+    calendar, nse_store = get_nse_calendar(), get_bar_stores()[0]
+    session_day = calendar.session_day()
+    prev_day = calendar.previous_trading_day(session_day)
     def fetch_gap(ticker):
         try:
-            df = yf.Ticker(ticker).history(period="5d", interval="1d")
-            if len(df) >= 2:
-                prev_close = float(df['Close'].iloc[-2])
+            # Previous closes come precomputed with the EOD snapshot; only today's open is fetched
+            prev_close = nse_store.close_on(ticker, prev_day)
+            df = get_bars(ticker, "1d", days=1)
+            if prev_close and not df.empty and df.index[-1].date() == session_day:
                 today_open = float(df['Open'].iloc[-1])
                 if prev_close > 0 and today_open > 0:
                     gap_pct = ((today_open - prev_close) / prev_close) * 100
@@ -451,16 +392,15 @@ def scan_pre_market(stock_list):
         if r: movers.append(r)
     return sorted(movers, key=lambda x: abs(x['Gap %']), reverse=True)
 
-@st.cache_data(ttl=60, show_spinner=False)
+@swr_cache(ttl=60)
 def scan_open_movers(stock_list):
     movers = []
     def fetch_move(ticker):
         try:
-            df_day = yf.Ticker(ticker).history(period="1d", interval="1d")
+            df_day = get_bars(ticker, "1d", days=1)
             if not df_day.empty:
                 today_open = float(df_day['Open'].iloc[-1])
-                try: ltp = float(yf.Ticker(ticker).fast_info.last_price)
-                except: ltp = float(df_day['Close'].iloc[-1])
+                ltp = float(df_day['Close'].iloc[-1])
                 if today_open > 0 and ltp > 0:
                     move_pct = ((ltp - today_open) / today_open) * 100
                     if abs(move_pct) >= 1.5: 
@@ -474,22 +414,32 @@ def scan_open_movers(stock_list):
         if r: movers.append(r)
     return sorted(movers, key=lambda x: abs(x['Move %']), reverse=True)
 
-@st.cache_data(ttl=60, show_spinner=False)
+@st.cache_resource(show_spinner=False)
+def get_page_cache():
+    return PageCache(max_entries=128)
+
+@st.cache_resource(show_spinner=False)
+def get_volume_detector():
+    return VolumeSpikeDetector(bar_minutes=15)
+
+@swr_cache(ttl=60)
 def scan_oi_setup(item_list):
     setups = []
+    detector = get_volume_detector()
+    bar_len = datetime.timedelta(minutes=15)
     def fetch_oi(ticker):
         try:
-            df = yf.Ticker(ticker).history(period="2d", interval="15m")
-            if len(df) >= 3:
-                c1, v1 = df['Close'].iloc[-1], df['Volume'].iloc[-1]
-                c2, v2 = df['Close'].iloc[-2], df['Volume'].iloc[-2]
-                c3 = df['Close'].iloc[-3]
-                if v1 > (v2 * 1.5):
-                    oi_status = "🔥 High (Spike)"
-                    if c1 > c2: return {"Stock": ticker, "Signal": "Short Covering 🚀", "OI": oi_status, "Color": "green"}
-                    else: return {"Stock": ticker, "Signal": "Long Unwinding ⚠️" if c2 > c3 else "Short Buildup 📉", "OI": oi_status, "Color": "red"}
+            # Warm the per-slot stats once, afterwards only the sessions since the last ingested bar are walked
+            df = get_bars(ticker, "15m", days=detector.sessions_needed(ticker, market_now(IST).date(), 10))
+            if df.empty: return detector.latest(ticker)
+            now = market_now(df.index[-1].tzinfo)
+            last_seen = detector.last_bar_time(ticker)
+            for bar_time, row in df.iterrows():
+                if bar_time + bar_len > now: break
+                if last_seen is not None and bar_time <= last_seen: continue
+                detector.update(ticker, bar_time, row['Close'], row['Volume'])
+            return detector.latest(ticker)
         except: return None
-        return None
         
     with ThreadPoolExecutor(max_workers=40) as executor:
         results = list(executor.map(fetch_oi, item_list))
@@ -497,21 +447,20 @@ def scan_oi_setup(item_list):
         if r: setups.append(r)
     return setups
 
-def place_coindcx_order(market, side, order_type, price, quantity):
+@st.cache_resource(show_spinner=False)
+def get_order_gateway(key, secret):
+    return OrderGateway(key, secret).warm()
+
+def place_coindcx_order(market, side, order_type, price, quantity, client_order_id=None):
     try:
         key = st.secrets["DCX_KEY"]
         secret = st.secrets["DCX_SECRET"]
-    except: return {"error": "API Keys not found in Streamlit Secrets."}
-    secret_bytes = bytes(secret, 'utf-8')
-    timestamp = int(round(time.time() * 1000))
-    dcx_market = f"B-{market.replace('-USD', '_USDT')}"
-    body = {"side": side.lower(), "order_type": order_type, "market": dcx_market, "price_per_unit": price, "total_quantity": quantity, "timestamp": timestamp}
-    json_body = json.dumps(body, separators=(',', ':'))
-    signature = hmac.new(secret_bytes, json_body.encode(), hashlib.sha256).hexdigest()
-    url = "https://api.coindcx.com/exchange/v1/orders/create"
-    headers = {'X-AUTH-APIKEY': key, 'X-AUTH-SIGNATURE': signature, 'Content-Type': 'application/json'}
-    try: return requests.post(url, data=json_body, headers=headers).json()
-    except Exception as e: return {"error": str(e)}
+    except: return None, {"error": "API Keys not found in Streamlit Secrets."}
+    ticket = get_order_gateway(key, secret).submit(market, side, order_type, price, quantity, client_order_id)
+    try: return ticket, ticket.result(timeout=15)
+    except Exception as e: return ticket, {"error": f"No response from CoinDCX: {e}"}
+
+event_bus, trade_book, tracker, monitor, analytics = get_trade_engine()
 
 # --- 4. CSS ---
 css_string = (
@@ -570,7 +519,7 @@ with st.sidebar:
     ]
     
     ist_tz = pytz.timezone('Asia/Kolkata')
-    today_day = datetime.datetime.now(ist_tz).day
+    today_day = market_now(ist_tz).day
     rule_index = today_day % len(TRADING_RULES)
     
     st.markdown("### 💡 আজকের গোল্ডেন রুল")
@@ -625,28 +574,31 @@ with st.sidebar:
     if auto_refresh_toggle != st.session_state.auto_ref:
         st.session_state.auto_ref = auto_refresh_toggle
         st.rerun()
-    refresh_time = st.selectbox("Interval (Mins):", [1, 3, 5], index=0) 
+    refresh_time = st.selectbox("Interval (Mins):", [1, 3, 5], index=0, help="How often scans rerun. Live quotes and active trades refresh every 15 seconds.")
     
+    if isinstance(market_source, Player):
+        st.caption(f"⏪ REPLAY x{market_source.speed:g}: {market_now(pytz.timezone('Asia/Kolkata')).strftime('%d %b %H:%M:%S')} IST")
+    elif market_source is not None:
+        st.caption(f"⏺️ Recording market data to {market_source.path}")
+
+    st.checkbox("🧪 Profile each full run", key="profile_run", help="Samples every thread during a full app.py run and writes a flamegraph-compatible .folded file to ./profiles")
+
     if st.button("🗑️ Clear All History Data"):
-        st.session_state.active_trades = []
-        st.session_state.trade_history = []
-        if os.path.exists(ACTIVE_TRADES_FILE): os.remove(ACTIVE_TRADES_FILE)
-        if os.path.exists(HISTORY_TRADES_FILE): os.remove(HISTORY_TRADES_FILE)
+        trade_book.clear()
+        analytics.clear()
         st.success("History Cleared!")
         time.sleep(1)
         st.rerun()
 
 # --- 6. Top Navigation & Global Refresh ---
 ist_timezone = pytz.timezone('Asia/Kolkata')
-curr_time = datetime.datetime.now(ist_timezone)
-t_915 = curr_time.replace(hour=9, minute=15, second=0, microsecond=0)
-t_1530 = curr_time.replace(hour=15, minute=30, second=0, microsecond=0)
+curr_time = market_now(ist_timezone)
+SESSION_COLORS = {"PRE-MARKET": "#ff9800", "LIVE MARKET": "#28a745", "POST MARKET": "#dc3545", "MARKET CLOSED": "#6c757d"}
 
 if not is_crypto_mode:
     terminal_title = "HARIDAS NSE TERMINAL"
-    if curr_time < t_915: session, session_color = "PRE-MARKET", "#ff9800" 
-    elif curr_time <= t_1530: session, session_color = "LIVE MARKET", "#28a745" 
-    else: session, session_color = "POST MARKET", "#dc3545" 
+    session = get_nse_calendar().state(curr_time)
+    session_color = SESSION_COLORS[session]
 else:
     terminal_title = "HARIDAS CRYPTO TERMINAL"
     session, session_color = "LIVE 24/7 (CRYPTO)", "#17a2b8"
@@ -664,46 +616,60 @@ st.markdown(f"""
 col_ref1, col_ref2 = st.columns([8, 2])
 with col_ref2:
     if st.button("🔄 REFRESH LIVE DATA", type="primary", use_container_width=True):
-        st.cache_data.clear()
+        # Quotes are re-fetched now; scans keep serving their last result while they revalidate
+        fetch_coindcx_api.clear()
+        fetch_all_crypto.clear()
+        fetch_live_data.clear()
+        invalidate_tier("scan")
         st.rerun()
 
 # ==================== MAIN TERMINAL ====================
 if page_selection == "📈 MAIN TERMINAL":
-    
-    if not is_crypto_mode:
-        with st.spinner(f"Scanning 5m HA Charts (Sentiment: {user_sentiment})..."): 
-            live_signals = run_nse_strategy(current_watchlist, user_sentiment)
-    else:
-        with st.spinner(f"Scanning 1H HA Charts (Sentiment: {user_sentiment})..."): 
-            live_signals = run_crypto_strategy(current_watchlist, user_sentiment)
-
-    process_auto_trades(live_signals, is_crypto_mode)
 
-    with st.spinner("Fetching Market Movers & Trends for Entire Market..."):
+    # Every panel is a fragment on its own cadence (seconds). A panel rerun only
+    # re-executes that panel: no sidebar, CSS or other panels' scans.
+    # Quote panels tick every 15 s, scan panels follow the sidebar interval.
+    scan_every = refresh_time * 60
+    PANEL_REFRESH = {"indices": 15, "breadth": scan_every, "signals": scan_every, "trades": 15, "journal": scan_every,
+                     "movers": 2 * scan_every, "sectors": 2 * scan_every, "feed": 15}
+    def panel(name):
+        return st.fragment(run_every=PANEL_REFRESH[name] if st.session_state.auto_ref else None)
+
+    scan_watchlist, scan_sentiment = list(current_watchlist), user_sentiment
+    def scan_signals():
+        if not is_crypto_mode: return run_nse_strategy(scan_watchlist, scan_sentiment)
+        return run_crypto_strategy(scan_watchlist, scan_sentiment)
+
+    def load_movers():
         if is_crypto_mode:
             df_all_crypto = fetch_all_crypto()
-            if not df_all_crypto.empty:
-                adv = int((df_all_crypto['Change %'] > 0).sum())
-                dec = int((df_all_crypto['Change %'] < 0).sum())
-                df_renamed = df_all_crypto.rename(columns={'Asset': 'Stock', 'Change %': 'Pct'})
-                gainers = df_renamed[df_renamed['Pct'] > 0].head(5).to_dict('records')
-                losers = df_renamed[df_renamed['Pct'] < 0].sort_values(by='Pct', ascending=True).head(5).to_dict('records')
-                
-                trend_scan_list = list(set([s['Stock'] for s in live_signals] + current_watchlist + [g['Stock'] for g in gainers] + [l['Stock'] for l in losers]))
-                trends = get_crypto_trends(trend_scan_list)
-            else:
-                adv, dec = 0, 0
-                gainers, losers, trends = [], [], []
-        else:
-            adv, dec = calc_market_breadth(all_assets, False)
-            gainers, losers, trends = calc_dynamic_movers(all_assets, False)
-
-    important_assets = list(set([s['Stock'] for s in live_signals] + [g['Stock'] for g in gainers] + [l['Stock'] for l in losers] + current_watchlist))
-    filtered_trends = [t for t in trends if t['Stock'] in important_assets]
-
-    col1, col2, col3 = st.columns([1.25, 2.5, 1.25])
-
-    with col1:
+            if df_all_crypto.empty: return [], [], []
+            df_renamed = df_all_crypto.rename(columns={'Asset': 'Stock', 'Change %': 'Pct'})
+            gainers = df_renamed[df_renamed['Pct'] > 0].head(5).to_dict('records')
+            losers = df_renamed[df_renamed['Pct'] < 0].sort_values(by='Pct', ascending=True).head(5).to_dict('records')
+            trend_scan_list = sorted(set([s['Stock'] for s in scan_signals()] + current_watchlist + [g['Stock'] for g in gainers] + [l['Stock'] for l in losers]))
+            return gainers, losers, get_crypto_trends(trend_scan_list)
+        return calc_dynamic_movers(all_assets, False)
+
+    def market_filter(trades):
+        return [t for t in trades if (".NS" in t['Stock'] if not is_crypto_mode else "-USD" in t['Stock'])]
+
+    TABLE_PAGE_SIZE = 25
+    page_cache = get_page_cache()
+
+    def market_rows(which):
+        # Re-filtered only when the trade book changes; history is shown newest first
+        version = trade_book.version
+        if which == "history": return page_cache.get(("rows", which, market_mode, version), lambda: market_filter(trade_book.history)[::-1])
+        return page_cache.get(("rows", which, market_mode, version), lambda: market_filter(trade_book.active))
+
+    def page_picker(key, total):
+        pages = page_bounds(total, 1, TABLE_PAGE_SIZE)[3]
+        if pages == 1: return 1
+        return st.selectbox("Page", list(range(1, pages + 1)), key=key, format_func=lambda p: f"{p} / {pages}  ({total} rows)")
+
+    @panel("sectors")
+    def sectors_panel():
         if not is_crypto_mode:
             st.markdown("<div class='section-title'>📊 SECTOR PERFORMANCE</div>", unsafe_allow_html=True)
             with st.spinner("Fetching Sectors..."): real_sectors = calc_sector_perf(working_sectors, ignore_keys=[], is_crypto=is_crypto_mode)
@@ -731,6 +697,11 @@ if page_selection == "📈 MAIN TERMINAL":
                 sec_html += "</div>"
                 st.markdown(sec_html, unsafe_allow_html=True)
 
+        with st.spinner("Fetching Market Movers & Trends for Entire Market..."):
+            gainers, losers, trends = load_movers()
+        important_assets = set([s['Stock'] for s in scan_signals()] + [g['Stock'] for g in gainers] + [l['Stock'] for l in losers] + current_watchlist)
+        filtered_trends = [t for t in trends if t['Stock'] in important_assets]
+
         st.markdown("<div class='section-title'>🔍 TREND CONTINUITY</div>", unsafe_allow_html=True)
         if filtered_trends:
             t_html = "<div class='table-container'><table class='v38-table'><tr><th>Asset 🔗</th><th>Status</th></tr>"
@@ -741,7 +712,8 @@ if page_selection == "📈 MAIN TERMINAL":
             st.markdown(t_html, unsafe_allow_html=True)
         else: st.markdown("<p style='font-size:12px;text-align:center; color:#888;'>No 3-day trend found in active list.</p>", unsafe_allow_html=True)
 
-    with col2:
+    @panel("indices")
+    def indices_panel():
         st.markdown("<div class='section-title'>📉 MARKET INDICES (LIVE)</div>", unsafe_allow_html=True)
         idx_tv_map = {
             "Sensex": "BSE:SENSEX", "Nifty": "NSE:NIFTY", "USDINR": "FX_IDC:USDINR",
@@ -781,6 +753,15 @@ if page_selection == "📈 MAIN TERMINAL":
         indices_html += "</div>"
         st.markdown(indices_html, unsafe_allow_html=True)
 
+    @panel("breadth")
+    def breadth_panel():
+        if is_crypto_mode:
+            df_all_crypto = fetch_all_crypto()
+            adv = int((df_all_crypto['Change %'] > 0).sum()) if not df_all_crypto.empty else 0
+            dec = int((df_all_crypto['Change %'] < 0).sum()) if not df_all_crypto.empty else 0
+        else:
+            with st.spinner("Fetching Market Breadth..."): adv, dec = calc_market_breadth(all_assets, False)
+
         total_adv_dec = adv + dec
         adv_pct = (adv / total_adv_dec) * 100 if total_adv_dec > 0 else 50
         adv_title = "ADVANCE/ DECLINE (NSE)" if not is_crypto_mode else "ADVANCE/ DECLINE (CRYPTO 200+)"
@@ -798,6 +779,12 @@ if page_selection == "📈 MAIN TERMINAL":
         )
         st.markdown(adv_dec_html, unsafe_allow_html=True)
 
+    @panel("signals")
+    def signals_panel():
+        with st.spinner(f"Scanning {'1H' if is_crypto_mode else '5m'} HA Charts (Sentiment: {user_sentiment})..."): 
+            live_signals = scan_signals()
+        process_auto_trades(live_signals, (market_mode, selected_sector, scan_sentiment, tuple(scan_watchlist)), scan_signals)
+
         if not is_crypto_mode:
             st.markdown(f"<div class='section-title'>🎯 LIVE SIGNALS FOR: {selected_sector} (5M HA+BB)</div>", unsafe_allow_html=True)
         else:
@@ -815,6 +802,60 @@ if page_selection == "📈 MAIN TERMINAL":
         else:
             st.info("⏳ No fresh signals right now.")
 
+    @panel("trades")
+    def trades_panel():
+        display_active = market_rows("active")
+
+        if 'risk_settings' not in st.session_state:
+            st.session_state.risk_settings = {"capital": 100.0, "risk_pct": 2.0, "leverage": 10 if is_crypto_mode else 1}
+        risk_cfg = st.session_state.risk_settings
+        # The settings widgets render below the table; take this run's values from their keys first
+        for cfg_key, widget_key in (("capital", "risk_capital"), ("risk_pct", "risk_pct"), ("leverage", "risk_leverage")):
+            if widget_key in st.session_state: risk_cfg[cfg_key] = st.session_state[widget_key]
+        positions = build_positions(display_active, scan_signals(), sector_of)
+        quote_snapshot = {sym: live_ltp(sym) for sym in positions['Stock'].unique()}
+        risk_rows, exposure = portfolio_risk(positions, quote_snapshot, risk_cfg['capital'], risk_cfg['risk_pct'], risk_cfg['leverage'])
+        active_risk = risk_rows[risk_rows['Kind'] == "ACTIVE"].to_dict('records')
+
+        st.markdown("<div class='section-title'>⏳ ACTIVE TRADES (RUNNING AUTO-TRACKER)</div>", unsafe_allow_html=True)
+        if len(display_active) > 0:
+            # Live LTP/P&L change every quote, so only the visible page is rendered (not cached)
+            start, end, _, _ = page_bounds(len(display_active), st.session_state.get("active_page", 1), TABLE_PAGE_SIZE)
+            act_html = "<div class='table-container'><table class='v38-table'><tr><th>Asset 🔗</th><th>Signal</th><th>Entry</th><th>Live LTP</th><th>Live P&L</th><th>Target</th><th>SL</th><th>Time</th></tr>"
+            for t, r in zip(display_active[start:end], active_risk[start:end]):
+                link = get_tv_link(t['Stock'], market_mode)
+                prefix = "₹" if not is_crypto_mode else "$"
+                points, pnl_pct = r['Points'], r['P&L %']
+                pnl_color = "green" if points >= 0 else "red"
+                sign = "+" if points >= 0 else ""
+                formatted_points = fmt_price(abs(points), is_crypto_mode)
+                
+                act_html += f"<tr><td style='font-weight:bold;'><a href='{link}' target='_blank'>🔸 {t['Stock']}</a></td><td style='font-weight:bold;'>{t['Signal']}</td><td>{prefix}{fmt_price(t['Entry'], is_crypto_mode)}</td><td>{prefix}{fmt_price(r['LTP'], is_crypto_mode)}</td><td style='color:{pnl_color}; font-weight:bold;'>{sign}{prefix}{formatted_points} ({sign}{pnl_pct:.2f}%)</td><td style='color:#856404;'>{prefix}{fmt_price(t['Target'], is_crypto_mode)}</td><td style='color:#dc3545;'>{prefix}{fmt_price(t['SL'], is_crypto_mode)}</td><td>{t['Date']}</td></tr>"
+            act_html += "</table></div>"
+            st.markdown(act_html, unsafe_allow_html=True)
+            page_picker("active_page", len(display_active))
+        else:
+            st.info("No trades are currently active for this market.")
+
+        st.markdown("<div class='section-title'>🧮 PORTFOLIO RISK (ACTIVE + LIVE SIGNALS)</div>", unsafe_allow_html=True)
+        with st.expander("⚙️ Risk Settings"):
+            r_col1, r_col2, r_col3 = st.columns(3)
+            with r_col1: risk_cfg['capital'] = st.number_input("Total Capital", min_value=1.0, value=float(risk_cfg['capital']), step=10.0, key="risk_capital")
+            with r_col2: risk_cfg['risk_pct'] = st.number_input("Risk % per Trade", min_value=0.1, max_value=100.0, value=float(risk_cfg['risk_pct']), step=0.5, key="risk_pct")
+            with r_col3: risk_cfg['leverage'] = st.slider("Leverage (x)", min_value=1, max_value=100, value=int(risk_cfg['leverage']), key="risk_leverage")
+        if not risk_rows.empty:
+            committed = risk_rows[risk_rows['Kind'] == "ACTIVE"]
+            rk_col1, rk_col2, rk_col3 = st.columns(3)
+            rk_col1.metric("Open Notional", fmt_price(committed['Notional'].sum(), is_crypto_mode))
+            rk_col2.metric("Margin in Use", fmt_price(committed['Margin'].sum(), is_crypto_mode))
+            open_pnl = committed['P&L Amt'].sum()
+            rk_col3.metric("Open P&L", fmt_price(open_pnl, is_crypto_mode), delta=f"{open_pnl:.2f}")
+            st.dataframe(exposure.round(2), use_container_width=True, hide_index=True)
+        else:
+            st.info("No open positions or live signals to size.")
+
+    @st.fragment
+    def journal_form_panel():
         st.markdown("<div class='section-title'>📝 TRADE JOURNAL (MANUAL LOG)</div>", unsafe_allow_html=True)
         with st.expander("➕ Add New Trade to Journal"):
             with st.form("journal_form"):
@@ -829,73 +870,70 @@ if page_selection == "📈 MAIN TERMINAL":
                     if j_entry > 0 and j_exit > 0:
                         points = j_exit - j_entry if j_signal == "BUY" else j_entry - j_exit
                         pnl_pct = (points / j_entry) * 100
-                        st.session_state.trade_history.append({
+                        event_bus.publish(TOPIC_JOURNAL, {
                             "Date": datetime.datetime.now(ist_timezone).strftime("%Y-%m-%d %H:%M"),
                             "Stock": j_asset.upper(), "Signal": j_signal, "Entry": j_entry, "Exit": j_exit,
                             "Status": "MANUAL ENTRY", "P&L %": round(pnl_pct, 2), "Points": points
                         })
-                        save_data(st.session_state.trade_history, HISTORY_TRADES_FILE)
                         st.success("✅ Trade saved!")
 
-        display_active = [t for t in st.session_state.active_trades if (".NS" in t['Stock'] if not is_crypto_mode else "-USD" in t['Stock'])]
-        display_history = [t for t in st.session_state.trade_history if (".NS" in t['Stock'] if not is_crypto_mode else "-USD" in t['Stock'])]
-
-        st.markdown("<div class='section-title'>⏳ ACTIVE TRADES (RUNNING AUTO-TRACKER)</div>", unsafe_allow_html=True)
-        if len(display_active) > 0:
-            act_html = "<div class='table-container'><table class='v38-table'><tr><th>Asset 🔗</th><th>Signal</th><th>Entry</th><th>Live LTP</th><th>Live P&L</th><th>Target</th><th>SL</th><th>Time</th></tr>"
-            for t in display_active:
-                link = get_tv_link(t['Stock'], market_mode)
-                prefix = "₹" if not is_crypto_mode else "$"
-                
-                res = fetch_live_data(t['Stock'], is_crypto_mode)
-                ltp = res[0]
-                if ltp == 0: ltp = t['Entry'] 
-                
-                if t['Signal'] == 'BUY':
-                    points = ltp - t['Entry']
-                    pnl_pct = (points / t['Entry']) * 100 if t['Entry'] > 0 else 0
-                else:
-                    points = t['Entry'] - ltp
-                    pnl_pct = (points / t['Entry']) * 100 if t['Entry'] > 0 else 0
-                    
-                pnl_color = "green" if points >= 0 else "red"
-                sign = "+" if points >= 0 else ""
-                formatted_points = fmt_price(abs(points), is_crypto_mode)
-                
-                act_html += f"<tr><td style='font-weight:bold;'><a href='{link}' target='_blank'>🔸 {t['Stock']}</a></td><td style='font-weight:bold;'>{t['Signal']}</td><td>{prefix}{fmt_price(t['Entry'], is_crypto_mode)}</td><td>{prefix}{fmt_price(ltp, is_crypto_mode)}</td><td style='color:{pnl_color}; font-weight:bold;'>{sign}{prefix}{formatted_points} ({sign}{pnl_pct:.2f}%)</td><td style='color:#856404;'>{prefix}{fmt_price(t['Target'], is_crypto_mode)}</td><td style='color:#dc3545;'>{prefix}{fmt_price(t['SL'], is_crypto_mode)}</td><td>{t['Date']}</td></tr>"
-            act_html += "</table></div>"
-            st.markdown(act_html, unsafe_allow_html=True)
-        else:
-            st.info("No trades are currently active for this market.")
+    def render_history_page(rows):
+        hist_html = "<div class='table-container'><table class='v38-table'><tr><th>Asset 🔗</th><th>Signal</th><th>Entry</th><th>Exit</th><th>P&L (Pts)</th><th>Status</th><th>Time</th></tr>"
+        for t in rows:
+            link = get_tv_link(t['Stock'], market_mode)
+            prefix = "₹" if not is_crypto_mode else "$"
+            
+            entry_p = float(t['Entry'])
+            exit_p = float(t['Exit'])
+            if t['Signal'] == 'BUY': points = exit_p - entry_p
+            else: points = entry_p - exit_p
+            
+            pnl_pct = float(t.get('P&L %', 0))
+            pnl_color = "green" if points >= 0 else "red"
+            sign = "+" if points >= 0 else ""
+            formatted_points = fmt_price(abs(points), is_crypto_mode)
+            
+            hist_html += f"<tr><td style='font-weight:bold;'><a href='{link}' target='_blank'>🔸 {t['Stock']}</a></td><td style='font-weight:bold;'>{t['Signal']}</td><td>{prefix}{fmt_price(entry_p, is_crypto_mode)}</td><td>{prefix}{fmt_price(exit_p, is_crypto_mode)}</td><td style='color:{pnl_color}; font-weight:bold;'>{sign}{prefix}{formatted_points} ({sign}{pnl_pct:.2f}%)</td><td style='font-weight:bold;'>{t['Status']}</td><td>{t['Date']}</td></tr>"
+        hist_html += "</table></div>"
+        return hist_html
 
+    @panel("journal")
+    def history_panel():
+        display_history = market_rows("history")
         st.markdown("<div class='section-title'>📚 AUTO TRADE HISTORY (CLOSED TRADES)</div>", unsafe_allow_html=True)
         if len(display_history) > 0:
-            hist_html = "<div class='table-container'><table class='v38-table'><tr><th>Asset 🔗</th><th>Signal</th><th>Entry</th><th>Exit</th><th>P&L (Pts)</th><th>Status</th><th>Time</th></tr>"
-            for t in display_history:
-                link = get_tv_link(t['Stock'], market_mode)
-                prefix = "₹" if not is_crypto_mode else "$"
-                
-                entry_p = float(t['Entry'])
-                exit_p = float(t['Exit'])
-                if t['Signal'] == 'BUY': points = exit_p - entry_p
-                else: points = entry_p - exit_p
-                
-                pnl_pct = float(t.get('P&L %', 0))
-                pnl_color = "green" if points >= 0 else "red"
-                sign = "+" if points >= 0 else ""
-                formatted_points = fmt_price(abs(points), is_crypto_mode)
-                
-                hist_html += f"<tr><td style='font-weight:bold;'><a href='{link}' target='_blank'>🔸 {t['Stock']}</a></td><td style='font-weight:bold;'>{t['Signal']}</td><td>{prefix}{fmt_price(entry_p, is_crypto_mode)}</td><td>{prefix}{fmt_price(exit_p, is_crypto_mode)}</td><td style='color:{pnl_color}; font-weight:bold;'>{sign}{prefix}{formatted_points} ({sign}{pnl_pct:.2f}%)</td><td style='font-weight:bold;'>{t['Status']}</td><td>{t['Date']}</td></tr>"
-            hist_html += "</table></div>"
-            st.markdown(hist_html, unsafe_allow_html=True)
-            
-            df_history = pd.DataFrame(display_history)
-            csv_journal = df_history.to_csv(index=False).encode('utf-8')
-            st.download_button("📥 Export Journal to Excel", data=csv_journal, file_name=f"Haridas_Journal_{datetime.date.today()}.csv", mime="text/csv")
+            start, end, page, _ = page_bounds(len(display_history), st.session_state.get("history_page", 1), TABLE_PAGE_SIZE)
+            st.markdown(page_cache.get(("history_html", market_mode, trade_book.version, page, TABLE_PAGE_SIZE),
+                                       lambda: render_history_page(display_history[start:end])), unsafe_allow_html=True)
+            page_picker("history_page", len(display_history))
+            st.download_button("📥 Export Journal to Excel", data=lambda: csv_export(display_history[::-1]), file_name=f"Haridas_Journal_{datetime.date.today()}.csv", mime="text/csv", on_click="ignore")
         else:
             st.info("No closed trades yet for this market.")
 
-    with col3:
+        with trade_book.lock: analytics.sync(trade_book.history)
+        market_key = "CRYPTO" if is_crypto_mode else "NSE"
+        overview = analytics.summary(market_key)
+        if overview['Trades'] > 0:
+            with st.expander("📈 JOURNAL ANALYTICS (EQUITY, DRAWDOWN, EDGE)"):
+                pf = overview['Profit Factor']
+                a_col1, a_col2, a_col3, a_col4, a_col5 = st.columns(5)
+                a_col1.metric("Trades", overview['Trades'])
+                a_col2.metric("Win Rate", f"{overview['Win Rate %']:.2f}%")
+                a_col3.metric("Expectancy", f"{overview['Expectancy %']:.2f}%")
+                a_col4.metric("Profit Factor", "∞" if pf == float("inf") else f"{pf:.2f}")
+                a_col5.metric("Max Drawdown", f"{overview['Max DD %']:.2f}%")
+                curve = analytics.curve(market_key)
+                step = max(1, len(curve) // 500)  # keep the chart payload bounded for long journals
+                points = curve[::step] + ([curve[-1]] if (len(curve) - 1) % step else [])
+                st.line_chart(pd.DataFrame(points, columns=["Date", "Equity %", "Drawdown %"])[["Equity %", "Drawdown %"]])
+                dim = st.radio("Break down by:", ["Symbol", "Sector", "Signal"], horizontal=True, key="analytics_dim")
+                st.dataframe(pd.DataFrame(analytics.table(dim, market_key)), use_container_width=True, hide_index=True)
+
+    @panel("movers")
+    def movers_panel():
+        with st.spinner("Fetching Market Movers & Trends for Entire Market..."):
+            gainers, losers, _ = load_movers()
+
         st.markdown("<div class='section-title'>🚀 LIVE TOP GAINERS</div>", unsafe_allow_html=True)
         if gainers:
             g_html = "<div class='table-container'><table class='v38-table'><tr><th>Asset 🔗</th><th>LTP</th><th>%</th></tr>"
@@ -918,6 +956,32 @@ if page_selection == "📈 MAIN TERMINAL":
             st.markdown(l_html, unsafe_allow_html=True)
         else: st.markdown("<p style='font-size:12px;text-align:center;'>No live losers data.</p>", unsafe_allow_html=True)
 
+    @panel("feed")
+    def feed_panel():
+        st.markdown("<div class='section-title'>⚡ LIVE EVENT FEED</div>", unsafe_allow_html=True)
+        feed = event_bus.recent(topics=(TOPIC_SIGNAL, TOPIC_TRADE_OPEN, TOPIC_TRADE_CLOSE), limit=10)
+        if feed:
+            ev_html = "<div class='table-container'><table class='v38-table'><tr><th>Time</th><th>Event</th></tr>"
+            for ev in feed:
+                ev_html += f"<tr><td>{ev['ts'].strftime('%H:%M:%S')}</td><td style='text-align:left;'>{describe_event(ev)}</td></tr>"
+            ev_html += "</table></div>"
+            st.markdown(ev_html, unsafe_allow_html=True)
+        else: st.markdown("<p style='font-size:12px;text-align:center;'>No signal or trade events yet.</p>", unsafe_allow_html=True)
+
+    col1, col2, col3 = st.columns([1.25, 2.5, 1.25])
+    with col1:
+        sectors_panel()
+    with col2:
+        indices_panel()
+        breadth_panel()
+        signals_panel()
+        journal_form_panel()
+        trades_panel()
+        history_panel()
+    with col3:
+        movers_panel()
+        feed_panel()
+
 # ==================== PRE-MARKET & OPENING MOVERS ====================
 elif page_selection in ["🌅 9:10 AM: Pre-Market Gap", "🚀 9:15 AM: Opening Movers"]:
     st.markdown(f"<div class='section-title'>{page_selection}</div>", unsafe_allow_html=True)
@@ -946,10 +1010,10 @@ elif page_selection == "🔥 9:20 AM: OI Setup":
     with st.spinner("Scanning for Volume Spikes & OI Proxy..."):
         oi_setups = scan_oi_setup(all_assets)
     if oi_setups:
-        oi_html = "<div class='table-container'><table class='v38-table'><tr><th>Asset 🔗</th><th>Market Action (Signal)</th><th>OI / Vol Status</th></tr>"
+        oi_html = "<div class='table-container'><table class='v38-table'><tr><th>Asset 🔗</th><th>Market Action (Signal)</th><th>OI / Vol Status</th><th>Bar</th></tr>"
         for o in oi_setups: 
             link = get_tv_link(o['Stock'], market_mode)
-            oi_html += f"<tr><td style='font-weight:bold;'><a href='{link}' target='_blank'>🔸 {o['Stock']}</a></td><td style='color:{o['Color']}; font-weight:bold;'>{o['Signal']}</td><td style='color:#1a73e8; font-weight:bold;'>{o['OI']}</td></tr>"
+            oi_html += f"<tr><td style='font-weight:bold;'><a href='{link}' target='_blank'>🔸 {o['Stock']}</a></td><td style='color:{o['Color']}; font-weight:bold;'>{o['Signal']}</td><td style='color:#1a73e8; font-weight:bold;'>{o['OI']}</td><td>{o['Time']}</td></tr>"
         oi_html += "</table></div>"
         st.markdown(oi_html, unsafe_allow_html=True)
     else: st.info("No significant real volume/OI spikes detected.")
@@ -966,15 +1030,20 @@ elif page_selection == "⚡ REAL TRADE (CoinDCX)":
         
         st.markdown("<div class='calc-box'>", unsafe_allow_html=True)
         st.markdown("### Execute Order")
+        # Picked outside the form so its book starts loading before the order is submitted
+        t_market = st.selectbox("Select Coin", df_f['Asset'].tolist())
+        book_touch_now = get_order_books().touch(t_market)
+        if book_touch_now: st.caption(f"📖 Bid ${fmt_price(book_touch_now[0], True)} / Ask ${fmt_price(book_touch_now[1], True)}")
+        else: st.caption("📖 Order book loading...")
         with st.form("coindcx_order_form"):
             col1, col2 = st.columns(2)
             with col1:
-                t_market = st.selectbox("Select Coin", df_f['Asset'].tolist())
                 t_side = st.selectbox("Action", ["BUY", "SELL"])
             with col2:
                 t_type = st.selectbox("Order Type", ["limit_order", "market_order"])
                 t_price = st.number_input("Price (Required for Limit)", min_value=0.0, format="%.6f")
                 t_qty = st.number_input("Quantity", min_value=0.0, format="%.6f")
+            t_allow_cross = st.checkbox("Allow a limit price through the spread (fills at once, like a market order)")
             
             submit_real_trade = st.form_submit_button("🚀 PLACE REAL ORDER", use_container_width=True)
             
@@ -982,10 +1051,27 @@ elif page_selection == "⚡ REAL TRADE (CoinDCX)":
                 if t_qty <= 0: st.error("Quantity must be greater than 0.")
                 elif t_type == "limit_order" and t_price <= 0: st.error("Limit orders require a valid price.")
                 else:
-                    with st.spinner(f"Placing order on CoinDCX for {t_market}..."):
-                        response = place_coindcx_order(t_market, t_side, t_type, t_price, t_qty)
-                        if "error" in response: st.error(f"❌ Order Failed: {response['error']}")
-                        else: st.success(f"✅ Order Successfully Placed! Server Response: {response}")
+                    book_quote = get_order_books().quote(t_market, t_side, t_qty, wait=False)
+                    crosses = book_quote and t_type == "limit_order" and ((t_side == "BUY" and t_price >= book_quote['Ask']) or (t_side == "SELL" and t_price <= book_quote['Bid']))
+                    if crosses and not t_allow_cross:
+                        st.warning(f"Limit price crosses the spread (bid ${fmt_price(book_quote['Bid'], True)} / ask ${fmt_price(book_quote['Ask'], True)}) and would fill at once. Order not sent: tick the box above to allow it.")
+                    else:
+                        if book_quote:
+                            thin = " · ⚠️ book too thin for full size" if book_quote['Filled Qty'] < t_qty else ""
+                            st.caption(f"📖 {book_quote['Exchange']} book: bid ${fmt_price(book_quote['Bid'], True)} / ask ${fmt_price(book_quote['Ask'], True)} · spread {book_quote['Spread bps']:.1f} bps · est. fill ${fmt_price(book_quote['Fill'], True)} ({book_quote['Slippage bps']:.1f} bps slippage){thin}")
+                        # One client id per distinct order, so a double-submit never sends it twice
+                        order_sig = (t_market, t_side, t_type, t_price, t_qty)
+                        if st.session_state.get('last_order_sig') != order_sig:
+                            st.session_state.last_order_sig = order_sig
+                            st.session_state.last_order_id = uuid.uuid4().hex
+                        with st.spinner(f"Placing order on CoinDCX for {t_market}..."):
+                            ticket, response = place_coindcx_order(t_market, t_side, t_type, t_price, t_qty, st.session_state.last_order_id)
+                            if "error" in response: st.error(f"❌ Order Failed: {response['error']}")
+                            else:
+                                st.session_state.last_order_sig = None
+                                st.success(f"✅ Order Successfully Placed! Server Response: {response}")
+                            if ticket is not None and ticket.round_trip_ms is not None:
+                                st.caption(f"⏱️ Round-trip {ticket.round_trip_ms:.0f} ms (queued {ticket.queue_ms:.1f} ms) · client id {ticket.client_order_id}")
         st.markdown("</div>", unsafe_allow_html=True)
     else:
         st.error("Failed to fetch futures data. Please click Refresh.")
@@ -993,6 +1079,7 @@ elif page_selection == "⚡ REAL TRADE (CoinDCX)":
 elif page_selection == "🧮 Futures Risk Calculator":
     st.markdown("<div class='section-title'>🧮 Crypto Futures Risk Calculator</div>", unsafe_allow_html=True)
     st.markdown("<div class='calc-box'>", unsafe_allow_html=True)
+    calc_market = st.selectbox("Live Market (spread & depth from the order book)", ["Manual"] + sorted(a for a in all_assets if "-USD" in a))
     calc_col1, calc_col2, calc_col3, calc_col4 = st.columns(4)
     with calc_col1:
         trade_type = st.selectbox("Trade Direction", ["LONG (Buy)", "SHORT (Sell)"])
@@ -1007,16 +1094,16 @@ elif page_selection == "🧮 Futures Risk Calculator":
         st.write("")
         st.write("")
         if st.button("🚀 Calculate Risk", use_container_width=True):
-            price_diff = abs(entry_price - stop_loss)
-            if price_diff > 0:
-                risk_amt = capital * (risk_pct / 100)
-                pos_size_coin = risk_amt / price_diff
-                pos_size_usdt = pos_size_coin * entry_price
-                margin_required = pos_size_usdt / leverage
-                liq_price = entry_price * (1 - (1/leverage)) if trade_type == "LONG (Buy)" else entry_price * (1 + (1/leverage))
-                st.success(f"**Margin Needed:** ${margin_required:.2f}")
-                st.info(f"**Position Size:** {fmt_price(pos_size_coin, True)} Coins (${pos_size_usdt:.2f})")
-                st.error(f"**Liquidation Price ⚠️:** ${fmt_price(liq_price, True)}")
+            risk = position_risk(entry_price, stop_loss, capital, risk_pct, leverage, trade_type == "LONG (Buy)")
+            if risk:
+                st.success(f"**Margin Needed:** ${risk['Margin']:.2f}")
+                st.info(f"**Position Size:** {fmt_price(risk['Qty'], True)} Coins (${risk['Notional']:.2f})")
+                st.error(f"**Liquidation Price ⚠️:** ${fmt_price(risk['Liq Price'], True)}")
+                book_quote = get_order_books().quote(calc_market, "BUY" if trade_type == "LONG (Buy)" else "SELL", risk['Qty']) if calc_market != "Manual" else None
+                if book_quote:
+                    fill_risk = risk['Qty'] * abs(book_quote['Fill'] - stop_loss)
+                    st.caption(f"📖 Bid ${fmt_price(book_quote['Bid'], True)} / Ask ${fmt_price(book_quote['Ask'], True)} ({book_quote['Spread bps']:.1f} bps) · market fill for this size ≈ ${fmt_price(book_quote['Fill'], True)} → risk ${fill_risk:.2f} vs planned ${risk['Risk Amt']:.2f}")
+                elif calc_market != "Manual": st.caption(f"📖 No order book available for {calc_market}.")
             else: st.warning("Entry and Stop Loss cannot be the same!")
     st.markdown("</div>", unsafe_allow_html=True)
 
@@ -1032,36 +1119,29 @@ elif page_selection == "📊 Backtest Engine":
     if st.button("🚀 Run Backtest", use_container_width=True):
         with st.spinner(f"Fetching {bt_period} historical data for {bt_stock}..."):
             try:
-                bt_data = yf.Ticker(bt_stock).history(period=bt_period)
+                bt_data = fetch_history(bt_stock, bt_period)
                 if len(bt_data) > 3:
-                    trades = []
-                    for i in range(3, len(bt_data)):
-                        c1, o1 = bt_data['Close'].iloc[i-1], bt_data['Open'].iloc[i-1]
-                        c2, o2 = bt_data['Close'].iloc[i-2], bt_data['Open'].iloc[i-2]
-                        c3, o3 = bt_data['Close'].iloc[i-3], bt_data['Open'].iloc[i-3]
-
-                        if c1 > o1 and c2 > o2 and c3 > o3:
-                            entry_price, exit_price = bt_data['Open'].iloc[i], bt_data['Close'].iloc[i]
-                            if entry_price > 0:
-                                pnl = ((entry_price - exit_price) / entry_price) * 100
-                                trades.append({"Date": bt_data.index[i].strftime('%Y-%m-%d'), "Setup": "3 Days GREEN", "Signal": "SHORT", "Entry": fmt_price(entry_price, is_crypto_mode), "Exit": fmt_price(exit_price, is_crypto_mode), "P&L %": round(pnl, 2)})
-                        
-                        elif c1 < o1 and c2 < o2 and c3 < o3:
-                            entry_price, exit_price = bt_data['Open'].iloc[i], bt_data['Close'].iloc[i]
-                            if entry_price > 0:
-                                pnl = ((exit_price - entry_price) / entry_price) * 100
-                                trades.append({"Date": bt_data.index[i].strftime('%Y-%m-%d'), "Setup": "3 Days RED", "Signal": "BUY", "Entry": fmt_price(entry_price, is_crypto_mode), "Exit": fmt_price(exit_price, is_crypto_mode), "P&L %": round(pnl, 2)})
+                    bt_strategy = STRATEGIES["TREND_3_FADE"]
+                    bt_frame = get_indicator_cache().get((bt_stock, "1d", bt_period), bt_data)
+                    bt_trades = backtest(bt_strategy, bt_frame)
+                    trades = [{"Date": ts.strftime(bt_strategy.time_format), "Setup": "3 Days GREEN" if t['Signal'] == "SHORT" else "3 Days RED", "Signal": t['Signal'],
+                               "Entry": fmt_price(t['Entry'], is_crypto_mode), "Exit": fmt_price(t['Exit'], is_crypto_mode), "P&L %": t['P&L %']} for ts, t in bt_trades.iterrows()]
 
                     bt_df = pd.DataFrame(trades)
                     if not bt_df.empty:
                         link = get_tv_link(bt_stock, market_mode)
                         st.markdown(f"### <a href='{link}' target='_blank' style='text-decoration:none; color:#1a73e8;'>✅ Click to Open Chart for {bt_stock} 🔗</a>", unsafe_allow_html=True)
-                        total_pnl = bt_df['P&L %'].sum()
-                        win_rate = (len(bt_df[bt_df['P&L %'] > 0]) / len(bt_df)) * 100
+                        bt_stats, bt_equity = summarize(bt_df['P&L %'])
+                        total_pnl, pf = bt_stats['Net P&L %'], bt_stats['Profit Factor']
                         m_col1, m_col2, m_col3 = st.columns(3)
-                        m_col1.metric("Total Trades", len(bt_df))
-                        m_col2.metric("Win Rate", f"{win_rate:.2f}%")
+                        m_col1.metric("Total Trades", bt_stats['Trades'])
+                        m_col2.metric("Win Rate", f"{bt_stats['Win Rate %']:.2f}%")
                         m_col3.metric("Total Strategy P&L %", f"{total_pnl:.2f}%", delta=f"{total_pnl:.2f}%")
+                        m_col4, m_col5, m_col6 = st.columns(3)
+                        m_col4.metric("Expectancy", f"{bt_stats['Expectancy %']:.2f}%")
+                        m_col5.metric("Profit Factor", "∞" if pf == float("inf") else f"{pf:.2f}")
+                        m_col6.metric("Max Drawdown", f"{bt_stats['Max DD %']:.2f}%")
+                        st.line_chart(pd.DataFrame({"Equity %": bt_equity}, index=bt_df['Date']))
                         st.dataframe(bt_df, use_container_width=True)
                     else: st.info(f"No valid setups found for {bt_stock} in the last {bt_period}.")
             except Exception as e: st.error(f"Error fetching data: {e}")
@@ -1070,6 +1150,20 @@ elif page_selection == "⚙️ Scanner Settings":
     st.markdown("<div class='section-title'>⚙️ System Status</div>", unsafe_allow_html=True)
     st.success("✅ REAL 200+ CoinDCX Data Sync Active \n\n ✅ Crypto Trend Scanner Fixed (YF + Binance) \n\n ✅ Manual Market Refresh Active \n\n ✅ Full Market UI Restored")
 
-if st.session_state.auto_ref:
+    st.markdown("<div class='section-title'>🧠 Scan Cache Memory</div>", unsafe_allow_html=True)
+    cache_rows, (cache_used_mb, cache_budget_mb) = cache_stats()
+    st.progress(min(cache_used_mb / cache_budget_mb, 1.0) if cache_budget_mb else 0.0, text=f"{cache_used_mb:.2f} MB of {cache_budget_mb:.0f} MB budget (HARIDAS_CACHE_MB)")
+    if cache_rows: st.dataframe(pd.DataFrame(cache_rows), use_container_width=True, hide_index=True)
+
+if run_profiler is not None:
+    st.session_state.pop("active_profiler", None)
+    run_profiler.stop()
+    profile_path = run_profiler.write_folded()
+    with st.sidebar.expander(f"🧪 Run Profile ({run_profiler.wall:.2f}s wall, {run_profiler.cpu:.2f}s CPU)", expanded=True):
+        st.dataframe(pd.DataFrame(run_profiler.summary()), use_container_width=True, hide_index=True)
+        st.caption(f"Flamegraph stacks: {profile_path}")
+
+# MAIN TERMINAL panels refresh themselves as fragments; other pages still rerun whole
+if st.session_state.auto_ref and page_selection != "📈 MAIN TERMINAL":
     time.sleep(refresh_time * 60)
     st.rerun()
@@ -0,0 +1,227 @@
+"""One base-interval bar feed per symbol, higher timeframes resampled in memory.
+
+Every scanner used to download its own interval of the same symbol (5m,
+15m and 1d for NSE; 1h and 1d for crypto). A BarStore fetches only the
+base interval: a `warm_period` download the first time a symbol is seen,
+then a short `refresh_period` download merged onto the tail at most once
+per `max_age` seconds however many scanners ask. A symbol left untouched
+for longer than that period (a weekend, an idle session) gets a period
+long enough to reach back to its last stored bar, or a fresh warm download
+if even `warm_period` falls short, so the base series never has a hole. Resampled frames are
+cached per (symbol, interval) and only their last, still-forming bar is
+recomputed when new base bars arrive.
+
+Given an exchange `calendar`, a symbol fetched after the session closed is
+not fetched again until the next pre-open. The settled bars are then
+pickled to `snapshot_file` once, along with each symbol's closing price. A
+restart serves them without downloading. The next morning they are the
+warm base, so only today's bars are fetched and the previous-close table
+is already built.
+"""
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+import pytz
+import yfinance as yf
+
+logger = logging.getLogger(__name__)
+RESAMPLE_RULES = {"5m": "5min", "15m": "15min", "1h": "1h", "1d": "1D"}
+OHLCV = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+CATCH_UP_PERIODS = ("1d", "5d", "10d", "1mo", "3mo")
+
+
+def period_days(period):
+    """Days covered by a yfinance period string ('5d', '1mo', '1y')."""
+    for suffix, days in (("mo", 30), ("y", 365), ("d", 1)):
+        if period.endswith(suffix): return int(period[:-len(suffix)]) * days
+    raise ValueError(f"unsupported period {period!r}")
+
+
+class _SymbolBars:
+    __slots__ = ("lock", "base", "fetched_at", "final_for", "version", "resampled")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.base = None
+        self.fetched_at = 0.0
+        self.final_for = None
+        self.version = 0
+        self.resampled = {}
+
+
+class BarStore:
+    """`bars(symbol, interval, days)` for any interval >= `base_interval`.
+
+    `session_offset` shifts intraday bins to the exchange's session start
+    (NSE hourly bars start at 9:15, not 9:00). `calendar` is an
+    NSECalendar-like object with `closed_session()`, `last_session()` and
+    `next_trading_day()`; without one every calendar day is a session.
+    `clock()` is a tz-aware 'now' (the calendar's clock by default).
+    """
+
+    def __init__(self, base_interval, warm_period, refresh_period, max_age=15, keep_days=10, session_offset=None,
+                 calendar=None, snapshot_file=None, snapshot_delay=5.0, clock=None):
+        self.base_interval = base_interval
+        self.warm_period = warm_period
+        self.refresh_period = refresh_period
+        self.max_age = max_age
+        self.keep_days = keep_days
+        self.session_offset = session_offset
+        self.calendar = calendar
+        self.snapshot_file = snapshot_file
+        self.snapshot_delay = snapshot_delay
+        self.clock = clock or (calendar.now if calendar is not None else lambda: pd.Timestamp.now(tz=pytz.utc))
+        self.fetches = 0
+        self._symbols = {}
+        self._closes = {}
+        self._snapshot_timer = None
+        self._lock = threading.Lock()
+        if calendar is not None and snapshot_file: self.load_snapshot()
+
+    def _state(self, symbol):
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None: state = self._symbols[symbol] = _SymbolBars()
+            return state
+
+    def _refresh(self, symbol, state):
+        """Called with state.lock held; concurrent callers for one symbol wait and reuse the result."""
+        closed = self.calendar.closed_session() if self.calendar is not None else None
+        if state.base is not None and (closed is not None and state.final_for == closed): return
+        if state.base is not None and time.monotonic() - state.fetched_at < self.max_age: return
+        period = self._catch_up_period(state)
+        df = yf.Ticker(symbol).history(period=period, interval=self.base_interval)
+        with self._lock: self.fetches += 1
+        state.fetched_at = time.monotonic()
+        if df is None or df.empty: return
+        state.final_for = closed
+        if closed is not None: self._schedule_snapshot()
+        df = df[[c for c in OHLCV if c in df.columns]]
+        if state.base is None or state.base.empty or period == self.warm_period:
+            base = df
+            state.resampled.clear()
+        else:
+            base = pd.concat([state.base[state.base.index < df.index[0]], df])
+        days = base.index.normalize().unique()
+        if len(days) > self.keep_days + 1:
+            base = base[base.index >= days[-self.keep_days]]
+            state.resampled.clear()
+        state.base = base
+        state.version += 1
+
+    def _catch_up_period(self, state):
+        """Shortest period reaching back to the last stored bar's session, else the warm period."""
+        if state.base is None or state.base.empty: return self.warm_period
+        last_day, tz, now = state.base.index[-1].date(), state.base.index.tz, self.clock()
+        today = (now.astimezone(tz) if tz is not None else now).date()
+        sessions, day = 0, last_day
+        while day < today and sessions <= period_days(self.warm_period):
+            day = self.calendar.next_trading_day(day) if self.calendar is not None else day + pd.Timedelta(days=1)
+            sessions += 1
+        # The last stored session is refetched too unless its bars were already final
+        needed = sessions + (0 if state.final_for == last_day else 1)
+        for period in sorted({self.refresh_period, *CATCH_UP_PERIODS}, key=period_days):
+            if period_days(period) >= period_days(self.warm_period): break
+            if period_days(period) >= needed: return period
+        return self.warm_period
+
+    def _resample(self, state, interval):
+        cached = state.resampled.get(interval)
+        if cached is not None and cached[0] == state.version: return cached[1]
+        rule = RESAMPLE_RULES[interval]
+        offset = self.session_offset if interval != "1d" else None
+        base, prev = state.base, cached[1] if cached is not None else None
+        if prev is not None and not prev.empty:
+            # Bars before the last cached one are closed; only rebuild from its start
+            tail = base[base.index >= prev.index[-1]].resample(rule, offset=offset).agg(OHLCV).dropna(subset=["Open"])
+            frame = pd.concat([prev.iloc[:-1], tail])
+        else:
+            frame = base.resample(rule, offset=offset).agg(OHLCV).dropna(subset=["Open"])
+        state.resampled[interval] = (state.version, frame)
+        return frame
+
+    def bars(self, symbol, interval=None, days=None):
+        """Bars of `interval` (default: the base) covering the last `days` sessions; empty on failure."""
+        interval = interval or self.base_interval
+        state = self._state(symbol)
+        with state.lock:
+            try: self._refresh(symbol, state)
+            except Exception:
+                if state.base is None: return pd.DataFrame(columns=list(OHLCV))
+            if state.base is None: return pd.DataFrame(columns=list(OHLCV))
+            frame = state.base if interval == self.base_interval else self._resample(state, interval)
+        if days is not None and not frame.empty:
+            sessions = frame.index.normalize().unique()
+            if len(sessions) > days: frame = frame[frame.index >= sessions[-days]]
+        return frame.copy()  # scanners add indicator columns in place
+
+    def close_on(self, symbol, day):
+        """Last close on or before `day` (a session date); tables are kept per day.
+
+        Only a settled close from `day` itself is remembered. Failed lookups
+        and fallbacks to an earlier day are retried on the next call.
+        """
+        with self._lock:
+            table = self._closes.setdefault(day, {})
+            if symbol in table: return table[symbol]
+        frame = self.bars(symbol)
+        if frame.empty: return None
+        settled = frame.index[-1].date() > day or self._state(symbol).final_for == day
+        frame = frame[frame.index.date <= day]
+        if frame.empty: return None
+        close = float(frame['Close'].iloc[-1])
+        if settled and frame.index[-1].date() == day:
+            with self._lock: table[symbol] = close
+        return close
+
+    def _schedule_snapshot(self):
+        # Symbols settle one by one as scanners ask for them; write once per burst
+        if not self.snapshot_file: return
+        with self._lock:
+            if self._snapshot_timer is not None: return
+            self._snapshot_timer = threading.Timer(self.snapshot_delay, self.save_snapshot)
+            self._snapshot_timer.daemon = True
+            self._snapshot_timer.start()
+
+    def save_snapshot(self):
+        with self._lock:
+            self._snapshot_timer = None
+            session = self.calendar.closed_session()
+            states = [(sym, s) for sym, s in self._symbols.items() if s.base is not None and s.final_for == session]
+        if session is None or not states: return
+        bars = {sym: s.base for sym, s in states}
+        closes = {sym: float(df['Close'].iloc[-1]) for sym, df in bars.items() if not df.empty}
+        with self._lock: self._closes.setdefault(session, {}).update(closes)
+        tmp = f"{self.snapshot_file}.tmp"
+        try:
+            pd.to_pickle({"session": session, "interval": self.base_interval, "bars": bars, "closes": closes}, tmp)
+            os.replace(tmp, self.snapshot_file)
+        except Exception:
+            logger.exception("Could not write EOD snapshot %s", self.snapshot_file)
+
+    def load_snapshot(self):
+        """Seed the store from the last session's snapshot; stale or foreign snapshots are ignored."""
+        try: snapshot = pd.read_pickle(self.snapshot_file)
+        except Exception: return False
+        session = snapshot.get("session")
+        if snapshot.get("interval") != self.base_interval or session != self.calendar.last_session(): return False
+        with self._lock:
+            for sym, df in snapshot["bars"].items():
+                state = self._symbols.setdefault(sym, _SymbolBars())
+                state.base, state.final_for = df, session
+                state.version += 1
+            self._closes.setdefault(session, {}).update(snapshot.get("closes", {}))
+        return True
+
+    def last_price(self, symbol):
+        frame = self.bars(symbol)
+        return float(frame['Close'].iloc[-1]) if not frame.empty else 0.0
+
+    def stats(self):
+        with self._lock: symbols = list(self._symbols.values())
+        return {"Symbols": len(symbols), "Fetches": self.fetches,
+                "Base Bars": sum(len(s.base) for s in symbols if s.base is not None),
+                "Resampled": sum(len(s.resampled) for s in symbols)}
@@ -0,0 +1,263 @@
+"""Tiered caching for the scanners.
+
+`swr_cache` is a stale-while-revalidate cache: once an entry is older than
+`ttl` the caller still gets the previous value immediately while one
+background thread recomputes it. Only a cold key (or one past `max_stale`)
+is computed in the caller's thread. Functions are grouped into named tiers
+so a manual refresh can invalidate one tier without touching the others.
+
+`single_flight` coalesces concurrent calls. While one call for a key is
+running upstream, other callers with the same arguments wait for it and
+share its result or exception, instead of issuing their own request.
+`st.cache_data` already holds a per-key lock while computing. This covers
+cold `swr_cache` misses and upstream calls that aren't cached at all, so
+every session and executor thread asking at market open costs one request.
+
+Entries are bounded two ways:
+- Each function keeps at most `max_entries` keys, least recently used
+  first out.
+- All swr_cache functions share one byte budget. It defaults to 64 MB and
+  can be set with HARIDAS_CACHE_MB. Going over it evicts the least
+  recently used entries across every function.
+
+Entry sizes are estimated when a value is stored. Scans keyed by whole
+watchlists and sentiments thus stop accumulating on a long-running server.
+
+Streamlit re-executes app.py on every rerun, so cached functions are
+registered by qualified name and a redefinition reuses the existing store.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="swr-refresh")
+TIERS = defaultdict(dict)
+FLIGHTS = {}
+DEFAULT_MAX_ENTRIES = 64
+
+
+def make_key(args, kwargs):
+    return repr((args, sorted(kwargs.items())))
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs `fn` once per key at a time; callers arriving meanwhile get the same outcome."""
+
+    def __init__(self):
+        self.calls = self.shared = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None: raise call.error
+            return call.value
+        try:
+            call.value = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock: self._inflight.pop(key, None)
+            call.done.set()
+        return call.value
+
+
+def estimate_size(obj, _depth=0):
+    """Approximate bytes held by a cached value (DataFrames deep, containers recursively)."""
+    if hasattr(obj, "memory_usage") and hasattr(obj, "index"):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    size = sys.getsizeof(obj)
+    if _depth > 4: return size
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v, _depth + 1) for v in obj)
+    return size
+
+
+class CacheBudget:
+    """Byte budget shared by every swr_cache function; least recently used entries go first."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def touch(self, owner, key):
+        with self._lock:
+            if (owner, key) in self._lru: self._lru.move_to_end((owner, key))
+
+    def charge(self, owner, key, entry):
+        victims = []
+        with self._lock:
+            old = self._lru.pop((owner, key), None)
+            if old is not None: self.used -= old.size
+            self._lru[(owner, key)] = entry
+            self.used += entry.size
+            while self.used > self.max_bytes and len(self._lru) > 1:
+                (victim_owner, victim_key), victim = self._lru.popitem(last=False)
+                self.used -= victim.size
+                victims.append((victim_owner, victim_key, victim))
+        # Owners' locks are taken only after ours is released
+        for victim_owner, victim_key, victim in victims: victim_owner._evict(victim_key, victim)
+
+    def release(self, owner, key, entry):
+        with self._lock:
+            if self._lru.get((owner, key)) is entry:
+                del self._lru[(owner, key)]
+                self.used -= entry.size
+
+
+BUDGET = CacheBudget(int(float(os.environ.get("HARIDAS_CACHE_MB", "64")) * 1024 * 1024))
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at", "refreshing", "size")
+
+    def __init__(self, value, fetched_at, size=0):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.refreshing = False
+        self.size = size
+
+
+class SWRFunction:
+    def __init__(self, fn, ttl, max_stale, tier, max_entries=DEFAULT_MAX_ENTRIES):
+        self.fn = fn
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.tier = tier
+        self.max_entries = max_entries
+        self.hits = self.stale_hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        functools.update_wrapper(self, fn)
+
+    def __call__(self, *args, **kwargs):
+        key = make_key(args, kwargs)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.fetched_at
+                if age < self.ttl + self.max_stale:
+                    self._entries.move_to_end(key)
+                    if age < self.ttl:
+                        self.hits += 1
+                    else:
+                        self.stale_hits += 1
+                        if not entry.refreshing:
+                            entry.refreshing = True
+                            _refresh_pool.submit(self._refresh, key, args, kwargs)
+                    BUDGET.touch(self, key)
+                    return entry.value
+            self.misses += 1
+        return self._flight.do(key, self._refresh, key, args, kwargs)
+
+    def _refresh(self, key, args, kwargs):
+        try:
+            value = self.fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None: entry.refreshing = False
+            raise
+        entry = _Entry(value, time.monotonic(), estimate_size(value))
+        dropped = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None: dropped.append((key, old))
+            self._entries[key] = entry
+            # Entries too old to be served again go first, then the least recently used
+            for k, e in list(self._entries.items()):
+                if k != key and entry.fetched_at - e.fetched_at >= self.ttl + self.max_stale:
+                    dropped.append((k, self._entries.pop(k)))
+            while len(self._entries) > self.max_entries:
+                dropped.append(self._entries.popitem(last=False))
+                self.evictions += 1
+        for k, e in dropped: BUDGET.release(self, k, e)
+        BUDGET.charge(self, key, entry)
+        return value
+
+    def _evict(self, key, entry):
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+                self.evictions += 1
+
+    def invalidate(self):
+        """Mark every entry stale; the next call serves it and revalidates."""
+        with self._lock:
+            for entry in self._entries.values(): entry.fetched_at = min(entry.fetched_at, time.monotonic() - self.ttl)
+
+    def clear(self):
+        with self._lock:
+            dropped = list(self._entries.items())
+            self._entries.clear()
+        for k, e in dropped: BUDGET.release(self, k, e)
+
+    def stats(self):
+        with self._lock:
+            return {"Function": self.__name__, "Tier": self.tier, "Entries": len(self._entries), "Max Entries": self.max_entries,
+                    "KB": round(sum(e.size for e in self._entries.values()) / 1024, 1),
+                    "Hits": self.hits, "Stale Hits": self.stale_hits, "Misses": self.misses, "Evictions": self.evictions}
+
+
+def swr_cache(ttl, max_stale=None, tier="scan", max_entries=DEFAULT_MAX_ENTRIES):
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        wrapped = TIERS[tier].get(name)
+        if wrapped is None:
+            wrapped = TIERS[tier][name] = SWRFunction(fn, ttl, ttl * 10 if max_stale is None else max_stale, tier, max_entries)
+        else:
+            wrapped.fn = fn
+            wrapped.max_entries = max_entries
+        return wrapped
+    return decorator
+
+
+def cache_stats():
+    """One row per swr_cache function, plus the shared budget as (used MB, budget MB)."""
+    rows = [fn.stats() for tier in TIERS.values() for fn in tier.values()]
+    return rows, (round(BUDGET.used / 2**20, 2), round(BUDGET.max_bytes / 2**20, 2))
+
+
+def invalidate_tier(tier):
+    for fn in TIERS.get(tier, {}).values(): fn.invalidate()
+
+
+def single_flight(fn):
+    """Coalesce concurrent calls to `fn` with equal arguments into one execution."""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    flight = FLIGHTS.setdefault(name, SingleFlight())
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return flight.do(make_key(args, kwargs), fn, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,114 @@
+"""Hedged crypto ticker fetch across CoinDCX and Binance.
+
+Binance used to be asked only after CoinDCX had failed or come back short.
+A slow CoinDCX reply therefore cost the full request timeout before the
+fallback started. HedgedQuotes asks the primary source first. If that has
+no complete answer within `hedge_delay`, the next source is started
+alongside it. The first complete answer is returned at once, so a quote
+costs roughly the faster source's latency plus the hedge delay.
+
+The slower request keeps running in the background. Whatever it returns
+is remembered for `max_age` seconds. It is used to fill in symbols the
+winning source doesn't list, while the winner's prices take precedence.
+"""
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+COINDCX_TICKER_URL = os.environ.get("COINDCX_BASE_URL", "https://api.coindcx.com").rstrip("/") + "/exchange/ticker"
+BINANCE_TICKER_URL = "https://api.binance.com/api/v3/ticker/24hr"
+
+
+def parse_coindcx(res):
+    ticker_dict = {}
+    if isinstance(res, list):
+        for item in res:
+            market = str(item.get('market', ''))
+            if market.endswith('USDT'):
+                base = market.replace('B-', '').replace('_USDT', '').replace('USDT', '')
+                if base:
+                    ticker_dict[f"{base}-USD"] = {"last_price": float(item.get('last_price', 0)),
+                                                  "change_pct": float(item.get('change_24_hour', 0))}
+    return ticker_dict
+
+
+def parse_binance(res):
+    ticker_dict = {}
+    if isinstance(res, list):
+        for item in res:
+            symbol = str(item.get('symbol', ''))
+            if symbol.endswith('USDT'):
+                base = symbol.replace('USDT', '')
+                if base:
+                    ticker_dict[f"{base}-USD"] = {"last_price": float(item.get('lastPrice', 0)),
+                                                  "change_pct": float(item.get('priceChangePercent', 0))}
+    return ticker_dict
+
+
+SOURCES = (("CoinDCX", COINDCX_TICKER_URL, parse_coindcx), ("Binance", BINANCE_TICKER_URL, parse_binance))
+
+
+class HedgedQuotes:
+    """`fetch()` -> {"BTC-USD": {"last_price", "change_pct"}, ...} from the first complete source.
+
+    Sources are (name, url, parser) in order of preference. An answer is
+    complete when it lists more than `min_markets` symbols.
+    """
+
+    def __init__(self, sources=SOURCES, hedge_delay=0.4, timeout=5, min_markets=50, max_age=60):
+        self.sources = sources
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+        self.min_markets = min_markets
+        self.max_age = max_age
+        self.wins = Counter()
+        self.last_latency = 0.0
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=2 * len(sources), thread_name_prefix="quotes")
+
+    def _call(self, source):
+        name, url, parse = source
+        try: data = parse(requests.get(url, timeout=self.timeout).json())
+        except Exception: data = {}
+        if data:
+            with self._lock: self._latest[name] = (time.monotonic(), data)
+        return data
+
+    def fetch(self):
+        start = time.monotonic()
+        queue, pending, results, winner = list(self.sources), {}, {}, None
+        deadline = start + self.timeout + self.hedge_delay * (len(queue) - 1)
+        next_hedge = start
+        while winner is None:
+            now = time.monotonic()
+            if queue and (now >= next_hedge or not pending):
+                source = queue.pop(0)
+                pending[self._pool.submit(self._call, source)] = source[0]
+                next_hedge = now + self.hedge_delay
+            if not pending or now >= deadline: break
+            done, _ = wait(pending, timeout=max(0.0, (next_hedge if queue else deadline) - now), return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = pending.pop(fut)
+                results[name] = fut.result()
+                if winner is None and len(results[name]) > self.min_markets: winner = name
+        self.last_latency = time.monotonic() - start
+
+        # Winner first, then the other sources in preference order, each filling only symbols not yet quoted
+        now = time.monotonic()
+        with self._lock:
+            for name, _, _ in self.sources:
+                if name not in results and name in self._latest and now - self._latest[name][0] <= self.max_age:
+                    results[name] = self._latest[name][1]
+        order = ([winner] if winner else []) + [name for name, _, _ in self.sources if name != winner]
+        merged = {}
+        for name in reversed(order): merged.update(results.get(name, {}))
+        if winner: self.wins[winner] += 1
+        return merged
+
+    def stats(self):
+        return {"Wins": dict(self.wins), "Last Latency ms": round(self.last_latency * 1000, 1)}
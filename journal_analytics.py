@@ -0,0 +1,171 @@
+"""Running performance analytics over the trade journal.
+
+Every closed or manually logged trade updates O(1) aggregates per market
+and per symbol, sector and signal type within it, and extends that
+market's equity/drawdown curve. A JSON snapshot records the aggregates and
+how many history rows they cover, so a restart only replays rows appended
+since the last save instead of recomputing years of trades.
+
+P&L is in the journal's unit, percent per trade; equity and drawdown are
+sums of those percents.
+"""
+import json
+import logging
+import math
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+DIMENSIONS = ("Symbol", "Sector", "Signal")
+
+
+def market_of(symbol):
+    if ".NS" in symbol: return "NSE"
+    if "-USD" in symbol: return "CRYPTO"
+    return "OTHER"
+
+
+def trade_pnl(trade):
+    try: pnl = float(trade.get('P&L %', 0))
+    except (TypeError, ValueError): return None
+    return None if math.isnan(pnl) else pnl
+
+
+def _fingerprint(trade):
+    return f"{trade.get('Date')}|{trade.get('Stock')}|{trade.get('Signal')}|{trade_pnl(trade)}"
+
+
+class RunningStats:
+    __slots__ = ("trades", "wins", "gross_win", "gross_loss", "equity", "peak", "max_dd")
+
+    def __init__(self, trades=0, wins=0, gross_win=0.0, gross_loss=0.0, equity=0.0, peak=0.0, max_dd=0.0):
+        self.trades, self.wins = trades, wins
+        self.gross_win, self.gross_loss = gross_win, gross_loss
+        self.equity, self.peak, self.max_dd = equity, peak, max_dd
+
+    def add(self, pnl):
+        self.trades += 1
+        if pnl > 0:
+            self.wins += 1
+            self.gross_win += pnl
+        elif pnl < 0:
+            self.gross_loss -= pnl
+        self.equity += pnl
+        self.peak = max(self.peak, self.equity)
+        self.max_dd = max(self.max_dd, self.peak - self.equity)
+
+    def row(self):
+        if self.gross_loss > 0: profit_factor = round(self.gross_win / self.gross_loss, 2)
+        else: profit_factor = math.inf if self.gross_win > 0 else 0.0
+        return {"Trades": self.trades,
+                "Win Rate %": round(self.wins * 100 / self.trades, 2) if self.trades else 0.0,
+                "Expectancy %": round(self.equity / self.trades, 3) if self.trades else 0.0,
+                "Profit Factor": profit_factor, "Net P&L %": round(self.equity, 2), "Max DD %": round(self.max_dd, 2)}
+
+    def to_list(self):
+        return [getattr(self, f) for f in self.__slots__]
+
+
+def summarize(pnls):
+    """(stats row, equity curve) for a one-off list of P&L % values, e.g. a backtest."""
+    stats, curve = RunningStats(), []
+    for pnl in pnls:
+        stats.add(float(pnl))
+        curve.append(round(stats.equity, 4))
+    return stats.row(), curve
+
+
+class JournalAnalytics:
+    """Aggregates kept in step with a TradeBook's history list.
+
+    `sync(history)` is idempotent and only applies rows past the ones
+    already counted; if the history no longer matches (cleared or edited
+    on disk) it starts over.
+    """
+
+    def __init__(self, sector_of, snapshot_file=None, save_every=50):
+        self.sector_of = sector_of
+        self.snapshot_file = snapshot_file
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._reset()
+        if snapshot_file: self.load()
+
+    def _reset(self):
+        self.count = 0
+        self.last = None
+        self.markets = {}
+        self.stats = {dim: {} for dim in DIMENSIONS}
+        self.curves = {}
+        self._unsaved = 0
+
+    def _add(self, trade):
+        self.count += 1
+        self.last = _fingerprint(trade)
+        self._unsaved += 1
+        pnl = trade_pnl(trade)
+        if pnl is None: return
+        symbol = str(trade.get('Stock', ''))
+        market = market_of(symbol)
+        overall = self.markets.setdefault(market, RunningStats())
+        overall.add(pnl)
+        for dim, value in (("Symbol", symbol), ("Sector", self.sector_of(symbol)), ("Signal", str(trade.get('Signal', '')))):
+            self.stats[dim].setdefault((market, value), RunningStats()).add(pnl)
+        self.curves.setdefault(market, []).append([str(trade.get('Date', '')), round(overall.equity, 4), round(overall.peak - overall.equity, 4)])
+
+    def sync(self, history):
+        with self._lock:
+            n = len(history)
+            if self.count > n or (self.count and _fingerprint(history[self.count - 1]) != self.last): self._reset()
+            for trade in history[self.count:n]: self._add(trade)
+            if self.snapshot_file and self._unsaved >= self.save_every: self._save()
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            if self.snapshot_file and os.path.exists(self.snapshot_file): os.remove(self.snapshot_file)
+
+    def summary(self, market):
+        with self._lock:
+            return self.markets.get(market, RunningStats()).row()
+
+    def table(self, dimension, market):
+        with self._lock:
+            rows = [{dimension: value, **s.row()} for (m, value), s in self.stats[dimension].items() if m == market]
+        return sorted(rows, key=lambda r: r['Trades'], reverse=True)
+
+    def curve(self, market):
+        """[[date, equity, drawdown], ...] in journal order."""
+        with self._lock: return list(self.curves.get(market, []))
+
+    def save(self):
+        with self._lock: self._save()
+
+    def _save(self):
+        snapshot = {"version": SNAPSHOT_VERSION, "count": self.count, "last": self.last,
+                    "markets": {m: s.to_list() for m, s in self.markets.items()},
+                    "stats": {dim: [[m, v, *s.to_list()] for (m, v), s in table.items()] for dim, table in self.stats.items()},
+                    "curves": self.curves}
+        tmp = f"{self.snapshot_file}.tmp"
+        try:
+            with open(tmp, "w") as fh: json.dump(snapshot, fh)
+            os.replace(tmp, self.snapshot_file)
+            self._unsaved = 0
+        except OSError:
+            logger.exception("Could not write journal snapshot %s", self.snapshot_file)
+
+    def load(self):
+        try:
+            with open(self.snapshot_file) as fh: snapshot = json.load(fh)
+            if snapshot.get("version") != SNAPSHOT_VERSION: return False
+            markets = {m: RunningStats(*v) for m, v in snapshot['markets'].items()}
+            stats = {dim: {(row[0], row[1]): RunningStats(*row[2:]) for row in snapshot['stats'].get(dim, [])} for dim in DIMENSIONS}
+            count, last, curves = snapshot['count'], snapshot['last'], snapshot['curves']
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        with self._lock:
+            self._reset()
+            self.count, self.last, self.markets, self.stats, self.curves = count, last, markets, stats, curves
+        return True
@@ -0,0 +1,341 @@
+"""Concurrent-session load test for app.py against local data stand-ins.
+
+Starts a real Streamlit server whose yfinance, CoinDCX and Binance calls are
+replaced by in-process stand-ins that sleep for a configurable latency, then
+drives N websocket sessions through MAIN TERMINAL and the scanner pages at
+the same time, the way N browser tabs would. Reports render latency, server
+thread count, memory and upstream call volume for every N.
+
+    python load_test.py --sessions 1 2 4 8 --renders 3 --yf-latency-ms 80
+
+Every level gets a fresh server (cold caches) unless --warm is given.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import zlib
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import requests
+import yfinance as yf
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+MARKET_LABEL, PAGE_LABEL, AUTO_REFRESH_LABEL = "Toggle Global Market:", "Select Menu:", "Enable Auto-Refresh"
+NSE_MARKET, CRYPTO_MARKET = "🇮🇳 Indian Market (NSE)", "₿ Crypto Market (24/7)"
+NSE_PAGES = ["📈 MAIN TERMINAL", "🌅 9:10 AM: Pre-Market Gap", "🚀 9:15 AM: Opening Movers", "🔥 9:20 AM: OI Setup"]
+CRYPTO_PAGES = ["📈 MAIN TERMINAL", "⚡ REAL TRADE (CoinDCX)"]
+BAR_FREQ = {"1d": "1D", "1h": "1h", "15m": "15min", "5m": "5min", "1m": "1min"}
+PERIOD_DAYS = {"1d": 1, "2d": 2, "5d": 5, "10d": 10, "15d": 15, "1mo": 30, "3mo": 90, "6mo": 180, "1y": 365, "2y": 730}
+
+
+class UpstreamStubs:
+    """Synthetic yfinance / CoinDCX / Binance responses with injected latency."""
+
+    def __init__(self, yf_latency_ms=50.0, http_latency_ms=80.0, crypto_markets=250):
+        self.yf_latency = yf_latency_ms / 1000
+        self.http_latency = http_latency_ms / 1000
+        self.crypto_markets = crypto_markets
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, kind):
+        with self._lock: self.calls[kind] += 1
+
+    def bars(self, symbol, period="1mo", interval="1d"):
+        freq = BAR_FREQ.get(interval, "1D")
+        days = PERIOD_DAYS.get(period, 30)
+        per_day = 1 if interval == "1d" else {"1h": 24 if "-USD" in symbol else 7, "15m": 25, "5m": 75, "1m": 375}.get(interval, 1)
+        n = max(3, days * per_day if interval != "1d" else int(days * 5 / 7) or 1)
+        rng = np.random.default_rng(zlib.crc32(f"{symbol}|{interval}".encode()))
+        idx = pd.date_range(end=pd.Timestamp.now(tz="Asia/Kolkata").floor(freq), periods=n, freq=freq)
+        close = 100 + np.cumsum(rng.normal(0, 1, n))
+        open_ = close + rng.normal(0, 0.5, n)
+        return pd.DataFrame({"Open": open_, "High": np.maximum(open_, close) + np.abs(rng.normal(0, 0.5, n)),
+                             "Low": np.minimum(open_, close) - np.abs(rng.normal(0, 0.5, n)), "Close": close,
+                             "Volume": rng.integers(1_000, 50_000, n).astype(float)}, index=idx)
+
+    def ticker_cls(self):
+        stubs = self
+
+        class _FastInfo:
+            def __init__(self, symbol): self.symbol = symbol
+
+            @property
+            def last_price(self):
+                stubs.count("yf.fast_info")
+                time.sleep(stubs.yf_latency)
+                return float(stubs.bars(self.symbol, "5d", "1d")['Close'].iloc[-1])
+
+        class StubTicker:
+            def __init__(self, symbol, session=None):
+                self.symbol = symbol
+                self.fast_info = _FastInfo(symbol)
+
+            def history(self, period="1mo", interval="1d", **kwargs):
+                stubs.count(f"yf.history[{interval}]")
+                time.sleep(stubs.yf_latency)
+                return stubs.bars(self.symbol, period, interval)
+
+        return StubTicker
+
+    def http_get(self, url, *args, **kwargs):
+        time.sleep(self.http_latency)
+        if "coindcx.com/exchange/ticker" in url:
+            self.count("coindcx.ticker")
+            data = [{"market": f"C{i}USDT", "last_price": 1.0 + i, "change_24_hour": (i % 11) - 5} for i in range(self.crypto_markets)]
+            data += [{"market": f"{c}USDT", "last_price": 100.0 + i, "change_24_hour": i - 3} for i, c in enumerate(["BTC", "ETH", "SOL", "BNB", "XRP", "DOGE"])]
+        elif "binance.com/api/v3/klines" in url:
+            self.count("binance.klines")
+            data = [[0, "1.0", "1.2", "0.9", "1.1"], [0, "1.1", "1.3", "1.0", "1.2"], [0, "1.2", "1.4", "1.1", "1.3"]]
+        elif "binance.com/api/v3/ticker/24hr" in url:
+            self.count("binance.ticker")
+            data = [{"symbol": f"C{i}USDT", "lastPrice": str(1.0 + i), "priceChangePercent": str((i % 11) - 5)} for i in range(self.crypto_markets)]
+        elif "binance.com/api/v3/depth" in url:
+            self.count("binance.depth")
+            data = {"lastUpdateId": 1, "bids": [[str(100.0 - i * 0.1), "2.0"] for i in range(50)], "asks": [[str(100.1 + i * 0.1), "2.0"] for i in range(50)]}
+        else:
+            self.count("http.other")
+            data = {}
+        response = requests.models.Response()
+        response.status_code = 200
+        response._content = json.dumps(data).encode()
+        return response
+
+    def install(self):
+        yf.Ticker = self.ticker_cls()
+        requests.get = self.http_get
+
+    def dump_forever(self, path, interval=0.2):
+        while True:
+            with self._lock: snapshot = dict(self.calls)
+            with open(path + ".tmp", "w") as fh: json.dump(snapshot, fh)
+            os.replace(path + ".tmp", path)
+            time.sleep(interval)
+
+
+# --- SERVER SIDE ---
+def serve(port, yf_latency_ms, http_latency_ms, counters_path):
+    from streamlit.web import bootstrap
+    stubs = UpstreamStubs(yf_latency_ms, http_latency_ms)
+    stubs.install()
+    threading.Thread(target=stubs.dump_forever, args=(counters_path,), name="stub-counters", daemon=True).start()
+    os.chdir(os.path.dirname(counters_path))  # trade CSVs and profiles stay out of the repo
+    flags = {"server_port": port, "server_headless": True, "server_fileWatcherType": "none",
+             "browser_gatherUsageStats": False, "global_developmentMode": False}
+    bootstrap.load_config_options(flags)
+    bootstrap.run(APP_PATH, False, [], flags)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, workdir):
+    port = free_port()
+    counters = os.path.join(workdir, "stub_calls.json")
+    cmd = [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port), "--counters", counters,
+           "--yf-latency-ms", str(args.yf_latency_ms), "--http-latency-ms", str(args.http_latency_ms)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None: raise RuntimeError("server exited during startup")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200: return proc, port, counters
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not become healthy within 60s")
+
+
+def read_counters(path):
+    try:
+        with open(path) as fh: return Counter(json.load(fh))
+    except (OSError, ValueError):
+        return Counter()
+
+
+def proc_status(pid):
+    """(threads, rss MB) of the server process from /proc."""
+    threads, rss = 0, 0.0
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("Threads:"): threads = int(line.split()[1])
+                elif line.startswith("VmRSS:"): rss = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return threads, rss
+
+
+# --- CLIENT SIDE ---
+class BrowserSession:
+    """One websocket session speaking Streamlit's BackMsg/ForwardMsg protocol.
+
+    Widget ids are learned from the radios/checkboxes the server renders, and
+    every rerun resends the full widget state, like the frontend does. With
+    auto-refresh on, scanner pages sleep before `st.rerun()` and never report
+    a finished run, so a render then counts as done at its last delta once
+    the stream has been quiet for `idle` seconds.
+    """
+
+    def __init__(self, port, timeout=600, idle=None):
+        from websockets.sync.client import connect
+        self._connect = connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                                max_size=None, open_timeout=30, close_timeout=2)
+        self.ws = self._connect.__enter__()
+        self.timeout = timeout
+        self.idle = idle
+        self.widget_ids = {}
+        self.values = {}
+        self.exceptions = []
+
+    def render(self, **values):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        self.values.update(values)
+        msg = BackMsg()
+        msg.rerun_script.SetInParent()
+        for label, value in self.values.items():
+            if label not in self.widget_ids: continue
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = self.widget_ids[label]
+            if isinstance(value, bool): state.bool_value = value
+            else: state.string_value = value
+        started = last_delta = time.perf_counter()
+        self.ws.send(msg.SerializeToString())
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            wait = max(0.1, deadline - time.monotonic())
+            try:
+                raw = self.ws.recv(timeout=min(wait, self.idle) if self.idle else wait)
+            except TimeoutError:
+                if self.idle: return last_delta - started
+                raise
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            kind = fwd.WhichOneof("type")
+            if kind == "delta":
+                last_delta = time.perf_counter()
+                if fwd.delta.WhichOneof("type") == "new_element": self._learn(fwd.delta.new_element)
+            elif kind == "script_finished" and fwd.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY:
+                return time.perf_counter() - started
+        raise TimeoutError("no script_finished within timeout")
+
+    def _learn(self, element):
+        kind = element.WhichOneof("type")
+        if kind in ("radio", "checkbox"):
+            widget = getattr(element, kind)
+            self.widget_ids[widget.label] = widget.id
+        elif kind == "exception":
+            self.exceptions.append(element.exception.message)
+
+    def close(self):
+        self._connect.__exit__(None, None, None)
+
+
+def run_session(port, session_no, renders, auto_refresh, latencies, errors):
+    crypto = session_no % 2 == 1
+    pages = CRYPTO_PAGES if crypto else NSE_PAGES
+    try:
+        session = BrowserSession(port, idle=1.0 if auto_refresh else None)
+    except Exception as e:
+        errors.append(f"session {session_no}: connect failed: {e}")
+        return
+    try:
+        latencies.append(session.render())
+        if crypto or auto_refresh:
+            latencies.append(session.render(**{MARKET_LABEL: CRYPTO_MARKET if crypto else NSE_MARKET, AUTO_REFRESH_LABEL: auto_refresh}))
+        for i in range(renders):
+            latencies.append(session.render(**{PAGE_LABEL: pages[(session_no + i) % len(pages)]}))
+        errors.extend(f"session {session_no}: {m}" for m in session.exceptions)
+    except Exception as e:
+        errors.append(f"session {session_no}: {type(e).__name__}: {e}")
+    finally:
+        session.close()
+
+
+def run_level(n_sessions, args, server):
+    proc, port, counters_path = server
+    calls_before = read_counters(counters_path)
+    latencies, errors = [], []
+    peak = {"threads": 0, "rss": 0.0}
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.05):
+            threads, rss = proc_status(proc.pid)
+            peak["threads"] = max(peak["threads"], threads)
+            peak["rss"] = max(peak["rss"], rss)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    workers = [threading.Thread(target=run_session, args=(port, i, args.renders, args.auto_refresh, latencies, errors))
+               for i in range(n_sessions)]
+    for w in workers: w.start()
+    for w in workers: w.join()
+    wall = time.perf_counter() - started
+    time.sleep(0.5)  # let the server flush its call counters
+    done.set()
+    sampler.join()
+
+    calls = read_counters(counters_path) - calls_before
+    total_calls = sum(calls.values())
+    ordered = sorted(latencies) or [0.0]
+    return {"Sessions": n_sessions, "Renders": len(latencies), "Wall (s)": round(wall, 2),
+            "p50 (s)": round(statistics.median(ordered), 3), "p95 (s)": round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+            "Max (s)": round(ordered[-1], 3), "Peak Threads": peak["threads"], "Peak RSS (MB)": round(peak["rss"], 1),
+            "Upstream Calls": total_calls, "Calls/Render": round(total_calls / max(1, len(latencies)), 1),
+            "Errors": len(errors), "_calls": dict(calls), "_errors": errors[:3]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--renders", type=int, default=3, help="page switches per session after the first render")
+    parser.add_argument("--yf-latency-ms", type=float, default=50.0)
+    parser.add_argument("--http-latency-ms", type=float, default=80.0)
+    parser.add_argument("--auto-refresh", action="store_true", help="turn on the sidebar auto-refresh in every session")
+    parser.add_argument("--warm", action="store_true", help="reuse one server (and its caches) across levels")
+    parser.add_argument("--verbose", action="store_true", help="print upstream call breakdown and server logs")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--counters", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.yf_latency_ms, args.http_latency_ms, args.counters)
+        return
+
+    rows, server = [], None
+    try:
+        for n in args.sessions:
+            if server is None or not args.warm:
+                if server is not None: server[0].terminate(); server[0].wait()
+                server = start_server(args, tempfile.mkdtemp(prefix="haridas-load-"))
+            row = run_level(n, args, server)
+            rows.append(row)
+            print(f"N={n}: p50={row['p50 (s)']}s p95={row['p95 (s)']}s threads={row['Peak Threads']} rss={row['Peak RSS (MB)']}MB upstream={row['Upstream Calls']}", file=sys.stderr)
+            if args.verbose: print(f"    calls={row['_calls']} errors={row['_errors']}", file=sys.stderr)
+    finally:
+        if server is not None: server[0].terminate(); server[0].wait()
+
+    report = pd.DataFrame([{k: v for k, v in r.items() if not k.startswith("_")} for r in rows])
+    print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
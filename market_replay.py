@@ -0,0 +1,428 @@
+"""Record and replay upstream market data.
+
+    HARIDAS_RECORD=day.jsonl.gz streamlit run app.py
+        appends every yfinance history/fast_info answer and every CoinDCX /
+        Binance ticker and klines response to a gzip JSON-lines log.
+    HARIDAS_REPLAY=day.jsonl.gz HARIDAS_REPLAY_SPEED=30 streamlit run app.py
+        answers the same calls from the log on a virtual clock running at
+        30x; `market_now()` follows that clock.
+    python market_replay.py scan day.jsonl.gz --step-min 15 --out signals.csv
+        steps the clock through the whole log headlessly, rerunning the
+        scanner pages at every step and writing the signals they showed.
+
+Consecutive history responses overlap almost completely, so a history
+record only carries bars the log hasn't seen yet for that symbol/interval
+plus the index range the response covered. Ticker lists are stored as the
+entries that changed since the previous snapshot of the same URL.
+"""
+import argparse
+import bisect
+import datetime
+import gzip
+import html
+import json
+import os
+import queue
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+MARKET_URLS = ("api.coindcx.com/exchange/ticker", "api.binance.com/api/v3/klines", "api.binance.com/api/v3/ticker/24hr",
+               "api.binance.com/api/v3/depth", "public.coindcx.com/market_data/v3/orderbook")
+LIST_KEYS = ("market", "symbol")
+_active = None
+_upstream = {}
+
+
+def _index_ms(index):
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is None: idx = idx.tz_localize("UTC")
+    return idx.tz_convert("UTC").as_unit("ms").asi8.tolist()
+
+
+def _list_key(data):
+    if isinstance(data, list) and data and isinstance(data[0], dict):
+        for key in LIST_KEYS:
+            if key in data[0]: return key
+    return None
+
+
+def is_market_url(url):
+    return any(u in url for u in MARKET_URLS)
+
+
+def read_log(path):
+    records = []
+    try:
+        with gzip.open(path, "rt") as fh:
+            for line in fh: records.append(json.loads(line))
+    except (EOFError, gzip.BadGzipFile, json.JSONDecodeError):
+        pass  # a session killed mid-write leaves a truncated tail
+    return records
+
+
+class Recorder:
+    """Appends upstream answers to `path`; a writer thread does the I/O."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._seen = {}
+        self._snapshots = {}
+        self._fh = gzip.open(path, "at", compresslevel=6)
+        self._thread = threading.Thread(target=self._run, name="market-recorder", daemon=True)
+        self._thread.start()
+
+    def _emit(self, record):
+        # Called with the lock held so log order matches the order bars were marked seen
+        record["t"] = round(time.time(), 3)
+        self._queue.put(json.dumps(record, separators=(",", ":")))
+
+    def _run(self):
+        while True:
+            line = self._queue.get()
+            if line is None: break
+            self._fh.write(line + "\n")
+            if self._queue.empty(): self._fh.flush()
+        self._fh.close()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def history(self, symbol, period, interval, df):
+        idx = _index_ms(df.index) if not df.empty else []
+        tz = str(df.index.tz) if isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None else None
+        key = (symbol, interval)
+        with self._lock:
+            first, last = self._seen.get(key, (None, None))
+            keep = [i for i, ms in enumerate(idx) if first is None or ms < first or ms >= last]
+            if idx: self._seen[key] = (idx[0] if first is None else min(first, idx[0]), idx[-1] if last is None else max(last, idx[-1]))
+            self._emit({"k": "h", "s": symbol, "p": period, "i": interval, "tz": tz, "n": df.index.name,
+                        "c": list(df.columns), "x": [idx[i] for i in keep], "v": df.iloc[keep].to_numpy().tolist(),
+                        "r": [idx[0], idx[-1]] if idx else None})
+
+    def fast_price(self, symbol, price):
+        with self._lock: self._emit({"k": "f", "s": symbol, "v": price})
+
+    def http(self, url, data):
+        list_key = _list_key(data)
+        record = {"k": "u", "u": url, "lk": list_key}
+        with self._lock:
+            prev = self._snapshots.get(url) if list_key else None
+            if list_key: self._snapshots[url] = current = {item.get(list_key): item for item in data}
+            if prev is None:
+                record["v"] = data
+            else:
+                record["d"] = [item for k, item in current.items() if prev.get(k) != item]
+                record["x"] = [k for k in prev if k not in current]
+            self._emit(record)
+
+    def ticker_cls(self):
+        recorder, real_ticker = self, _upstream["Ticker"]
+
+        class _RecordingFastInfo:
+            def __init__(self, symbol, fast_info):
+                self._symbol, self._fast_info = symbol, fast_info
+
+            @property
+            def last_price(self):
+                try: price = self._fast_info.last_price
+                except Exception:
+                    recorder.fast_price(self._symbol, None)
+                    raise
+                recorder.fast_price(self._symbol, None if price is None else float(price))
+                return price
+
+            def __getattr__(self, name): return getattr(self._fast_info, name)
+
+        class RecordingTicker:
+            def __init__(self, symbol, *args, **kwargs):
+                self.symbol = symbol
+                self._ticker = real_ticker(symbol, *args, **kwargs)
+
+            def history(self, period="1mo", interval="1d", **kwargs):
+                df = self._ticker.history(period=period, interval=interval, **kwargs)
+                if isinstance(df, pd.DataFrame): recorder.history(self.symbol, period, interval, df)
+                return df
+
+            @property
+            def fast_info(self): return _RecordingFastInfo(self.symbol, self._ticker.fast_info)
+
+            def __getattr__(self, name): return getattr(self._ticker, name)
+
+        return RecordingTicker
+
+    def get(self, url, *args, **kwargs):
+        res = _upstream["get"](url, *args, **kwargs)
+        if is_market_url(url):
+            try: self.http(url, res.json())
+            except ValueError: pass
+        return res
+
+
+class Player:
+    """Answers upstream calls from a recorded log on a virtual clock.
+
+    State is rebuilt by applying records in log order up to the clock, so
+    each answer is whatever the live session would have seen at that time.
+    A key first requested slightly before its first record (e.g. the very
+    first scan) is served from that record if it lies within `grace`
+    virtual seconds. A `paused` player starts pinned at the log's start for
+    `set_time` stepping.
+    """
+
+    def __init__(self, path, speed=1.0, grace=300.0, paused=False):
+        self.records = read_log(path)
+        if not self.records: raise ValueError(f"no records in {path}")
+        self.start, self.end = self.records[0]['t'], self.records[-1]['t']
+        self.speed = speed
+        self.grace = grace
+        self._origin = time.monotonic()
+        self._manual = self.start if paused else None
+        self._lock = threading.Lock()
+        self._cursor = 0
+        self._positions = defaultdict(list)
+        for pos, record in enumerate(self.records): self._positions[self._key(record)].append(pos)
+        self._bars = defaultdict(dict)
+        self._bar_keys = defaultdict(list)
+        self._ranges, self._prices, self._http = {}, {}, {}
+
+    @staticmethod
+    def _key(record):
+        if record['k'] == "h": return ("h", record['s'], record['p'], record['i'])
+        if record['k'] == "f": return ("f", record['s'])
+        return ("u", record['u'])
+
+    def now_ts(self):
+        if self._manual is not None: return self._manual
+        return min(self.end, self.start + (time.monotonic() - self._origin) * self.speed)
+
+    def set_time(self, ts):
+        """Pin the clock (headless stepping); time only moves forward.
+
+        Caches and the NSE calendar read market_now() and assume it never goes
+        back, and applied records can't be unapplied, so an earlier `ts`
+        raises ValueError. Start a new Player to replay from the beginning.
+        """
+        with self._lock:
+            if ts < self.now_ts(): raise ValueError(f"cannot seek backwards from {self.now_ts()} to {ts}")
+            self._manual = ts
+
+    def _apply(self, record):
+        kind = record['k']
+        if kind == "h":
+            bars, keys = self._bars[(record['s'], record['i'])], self._bar_keys[(record['s'], record['i'])]
+            for ms, row in zip(record['x'], record['v']):
+                if ms not in bars: bisect.insort(keys, ms)
+                bars[ms] = dict(zip(record['c'], row))
+            self._ranges[(record['s'], record['p'], record['i'])] = (record['tz'], record['n'], record['c'], record['r'])
+        elif kind == "f":
+            self._prices[record['s']] = record['v']
+        elif "v" in record:
+            lk = record['lk']
+            self._http[record['u']] = {item.get(lk): item for item in record['v']} if lk else record['v']
+        else:
+            snapshot = self._http.setdefault(record['u'], {})
+            for item in record['d']: snapshot[item.get(record['lk'])] = item
+            for k in record['x']: snapshot.pop(k, None)
+
+    def _advance(self, ts):
+        while self._cursor < len(self.records) and self.records[self._cursor]['t'] <= ts:
+            self._apply(self.records[self._cursor])
+            self._cursor += 1
+
+    def _lookup(self, key, state, state_key):
+        now = self.now_ts()
+        self._advance(now)
+        if state_key not in state:
+            positions = self._positions.get(key, [])
+            nxt = bisect.bisect_left(positions, self._cursor)
+            if nxt < len(positions) and self.records[positions[nxt]]['t'] - now <= self.grace:
+                self._advance(self.records[positions[nxt]]['t'])
+        return state.get(state_key)
+
+    def history(self, symbol, period="1mo", interval="1d"):
+        with self._lock:
+            found = self._lookup(("h", symbol, period, interval), self._ranges, (symbol, period, interval))
+            if found is None: return pd.DataFrame()
+            tz, name, columns, covered = found
+            if covered is None: return pd.DataFrame(columns=columns)
+            keys = self._bar_keys[(symbol, interval)]
+            lo, hi = bisect.bisect_left(keys, covered[0]), bisect.bisect_right(keys, covered[1])
+            span, bars = keys[lo:hi], self._bars[(symbol, interval)]
+            rows = [bars[ms] for ms in span]
+        index = pd.to_datetime(span, unit="ms", utc=True)
+        index = index.tz_convert(tz) if tz else index.tz_localize(None)
+        return pd.DataFrame(rows, index=pd.DatetimeIndex(index, name=name), columns=columns)
+
+    def fast_price(self, symbol):
+        with self._lock: price = self._lookup(("f", symbol), self._prices, symbol)
+        if price is None: raise KeyError(f"no recorded price for {symbol}")
+        return price
+
+    def http(self, url):
+        with self._lock:
+            data = self._lookup(("u", url), self._http, url)
+            return list(data.values()) if isinstance(data, dict) else data
+
+    def ticker_cls(self):
+        player = self
+
+        class _ReplayFastInfo:
+            def __init__(self, symbol): self._symbol = symbol
+
+            @property
+            def last_price(self): return player.fast_price(self._symbol)
+
+        class ReplayTicker:
+            def __init__(self, symbol, *args, **kwargs):
+                self.symbol = symbol
+                self.fast_info = _ReplayFastInfo(symbol)
+
+            def history(self, period="1mo", interval="1d", **kwargs):
+                return player.history(self.symbol, period, interval)
+
+        return ReplayTicker
+
+    def get(self, url, *args, **kwargs):
+        if not is_market_url(url): return _upstream["get"](url, *args, **kwargs)
+        data = self.http(url)
+        response = requests.models.Response()
+        response.status_code = 404 if data is None else 200
+        response._content = json.dumps({} if data is None else data).encode()
+        response.url = url
+        return response
+
+
+def install(source):
+    """Route yfinance and requests.get through a Recorder or Player."""
+    global _active
+    if not _upstream: _upstream.update(Ticker=yf.Ticker, get=requests.get)
+    _active = source
+    yf.Ticker = source.ticker_cls()
+    requests.get = source.get
+    return source
+
+
+def install_from_env():
+    """Idempotent: Streamlit reruns app.py, this module stays loaded."""
+    if _active is not None: return _active
+    if os.environ.get("HARIDAS_REPLAY"):
+        return install(Player(os.environ["HARIDAS_REPLAY"], speed=float(os.environ.get("HARIDAS_REPLAY_SPEED", "1"))))
+    if os.environ.get("HARIDAS_RECORD"):
+        return install(Recorder(os.environ["HARIDAS_RECORD"]))
+    return None
+
+
+def active():
+    return _active
+
+
+def market_now(tz=None):
+    """Wall-clock now, or the replay clock's now while a Player is installed."""
+    if isinstance(_active, Player): return datetime.datetime.fromtimestamp(_active.now_ts(), tz)
+    return datetime.datetime.now(tz)
+
+
+# --- HEADLESS REPLAY ---
+NSE_SCAN_PAGES = ["📈 MAIN TERMINAL", "🔥 9:20 AM: OI Setup"]
+CRYPTO_SCAN_PAGES = ["📈 MAIN TERMINAL"]
+
+
+def _html_tables(markup):
+    """The scanners render their tables as HTML; yield each one as a list of row dicts."""
+    for table in re.findall(r"<table.*?</table>", markup, re.S):
+        cells = lambda tag, row: [html.unescape(re.sub(r"<[^>]+>", "", c)).replace("🔸", "").strip() for c in re.findall(rf"<{tag}[^>]*>(.*?)</{tag}>", row, re.S)]
+        rows = re.findall(r"<tr[^>]*>(.*?)</tr>", table, re.S)
+        if not rows: continue
+        header = cells("th", rows[0])
+        yield [dict(zip(header, cells("td", row))) for row in rows[1:]]
+
+
+def reset_caches():
+    import streamlit as st
+    from cache_layer import TIERS
+    st.cache_data.clear()
+    for tier in TIERS.values():
+        for fn in tier.values(): fn.clear()
+
+
+def scan(args):
+    from streamlit.testing.v1 import AppTest
+    player = install(Player(args.log, paused=True))
+    out_path = os.path.abspath(args.out) if args.out else None
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+    os.chdir(tempfile.mkdtemp(prefix="haridas-replay-"))  # trade CSVs stay out of the repo
+    pages = args.pages or (CRYPTO_SCAN_PAGES if args.crypto else NSE_SCAN_PAGES)
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+
+    step = args.step_min * 60
+    steps = max(1, int((player.end - player.start) // step) + 1)
+    rows, failures = [], 0
+    started = time.perf_counter()
+    for n in range(steps):
+        player.set_time(min(player.end, player.start + n * step))
+        clock = market_now(datetime.timezone(datetime.timedelta(hours=5, minutes=30))).strftime("%Y-%m-%d %H:%M")
+        reset_caches()
+        if n == 0:
+            at.run()
+            if args.crypto: at.sidebar.radio[0].set_value("₿ Crypto Market (24/7)").run()
+        for page in pages:
+            at.sidebar.radio[1].set_value(page).run()
+            if at.exception:
+                failures += 1
+                print(f"{clock} {page}: {at.exception[0].value}", file=sys.stderr)
+            for block in at.markdown:
+                for table in _html_tables(block.value):
+                    if table and "Signal" in table[0]: rows.extend({"Replay Time": clock, "Page": page, **r} for r in table)
+        if args.verbose: print(f"{clock}: {len(rows)} signal rows so far", file=sys.stderr)
+    wall = time.perf_counter() - started
+
+    out = pd.DataFrame(rows)
+    if out_path: out.to_csv(out_path, index=False)
+    span_h = (player.end - player.start) / 3600
+    print(f"Replayed {span_h:.2f}h of market data in {steps} steps x {len(pages)} pages: {wall:.1f}s wall, "
+          f"{len(out)} signal rows, {failures} failed renders" + (f" -> {out_path}" if out_path else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded market data log through the scanners")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_scan = sub.add_parser("scan", help="step the replay clock through the log and rerun the scanner pages")
+    p_scan.add_argument("log")
+    p_scan.add_argument("--step-min", type=float, default=15, help="virtual minutes between scanner runs")
+    p_scan.add_argument("--crypto", action="store_true", help="replay the crypto market pages")
+    p_scan.add_argument("--pages", nargs="+", help="menu entries to render at every step")
+    p_scan.add_argument("--out", help="CSV of every signal row shown, with its replay time")
+    p_scan.add_argument("--verbose", action="store_true")
+    p_info = sub.add_parser("info", help="summarise a log")
+    p_info.add_argument("log")
+    args = parser.parse_args()
+
+    if args.command == "scan":
+        scan(args)
+    else:
+        records = read_log(args.log)
+        if not records: sys.exit(f"no records in {args.log}")
+        kinds = pd.Series([r['k'] for r in records]).map({"h": "history", "f": "fast_info", "u": "http"}).value_counts()
+        ist = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+        span = [datetime.datetime.fromtimestamp(records[i]['t'], ist).strftime("%Y-%m-%d %H:%M:%S") for i in (0, -1)]
+        print(f"{args.log}: {len(records)} records, {os.path.getsize(args.log) / 2**20:.1f} MB, {span[0]} -> {span[1]} IST")
+        print(kinds.to_string())
+
+
+if __name__ == "__main__":
+    # Run through the importable module so app.py's `import market_replay` sees the installed Player
+    import market_replay
+    market_replay.main()
@@ -0,0 +1,131 @@
+"""Local stand-in for the CoinDCX REST API.
+
+Serves the public ticker and the signed order endpoint with configurable
+latency, checks HMAC signatures and honours client order ids, so the order
+gateway can be exercised and load-tested offline.
+
+    python mock_coindcx.py --port 8765                # serve only
+    python mock_coindcx.py --bench 500 --latency-ms 5 # serve + load-test the gateway
+
+Point the app at it with COINDCX_BASE_URL=http://127.0.0.1:8765.
+"""
+import argparse
+import hashlib
+import hmac
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from order_gateway import CREATE_ORDER_PATH, OrderGateway
+
+MOCK_KEY = "mock-key"
+MOCK_SECRET = "mock-secret"
+MOCK_COINS = ["BTC", "ETH", "BNB", "SOL", "XRP", "DOGE", "ADA", "AVAX", "LINK", "DOT", "TRX", "MATIC"]
+
+
+class MockCoinDCX(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency_ms=0.0, jitter_ms=0.0, key=MOCK_KEY, secret=MOCK_SECRET):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.key = key
+        self.secret = bytes(secret, 'utf-8')
+        self.orders = {}
+        self.order_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="mock-coindcx", daemon=True).start()
+        return self
+
+    def delay(self):
+        wait = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if wait > 0: time.sleep(wait / 1000)
+
+    def ticker(self):
+        return [{"market": f"{coin}USDT", "last_price": str(round(random.uniform(0.1, 70000), 4)),
+                 "change_24_hour": str(round(random.uniform(-8, 8), 2))} for coin in MOCK_COINS]
+
+    def create_order(self, body):
+        client_id = body.get("client_order_id")
+        with self.lock:
+            if client_id and client_id in self.orders: return self.orders[client_id]
+            order = {"orders": [{"id": f"mock-{next(self.order_ids)}", "client_order_id": client_id,
+                                 "market": body.get("market"), "side": body.get("side"), "order_type": body.get("order_type"),
+                                 "price_per_unit": body.get("price_per_unit"), "total_quantity": body.get("total_quantity"),
+                                 "status": "open", "created_at": body.get("timestamp")}]}
+            if client_id: self.orders[client_id] = order
+            return order
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args): pass
+
+    def _send(self, code, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self.server.delay()
+        if self.path.startswith("/exchange/ticker"): self._send(200, self.server.ticker())
+        else: self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.delay()
+        if self.path != CREATE_ORDER_PATH: return self._send(404, {"error": "not found"})
+        expected = hmac.new(self.server.secret, raw, hashlib.sha256).hexdigest()
+        if self.headers.get("X-AUTH-APIKEY") != self.server.key or not hmac.compare_digest(expected, self.headers.get("X-AUTH-SIGNATURE", "")):
+            return self._send(401, {"code": 401, "message": "Invalid signature", "error": "Invalid signature"})
+        self._send(200, self.server.create_order(json.loads(raw)))
+
+
+def run_bench(n_orders, latency_ms, jitter_ms, workers):
+    server = MockCoinDCX(latency_ms=latency_ms, jitter_ms=jitter_ms).start()
+    gateway = OrderGateway(MOCK_KEY, MOCK_SECRET, base_url=server.base_url, workers=workers).warm()
+    started = time.perf_counter()
+    tickets = [gateway.submit("BTC-USD", "BUY" if i % 2 == 0 else "SELL", "limit_order", 65000.0, 0.001) for i in range(n_orders)]
+    errors = sum(1 for t in tickets if "error" in t.result(timeout=60))
+    elapsed = time.perf_counter() - started
+    stats = gateway.latency_stats()
+    queue_ms = sorted(t.queue_ms for t in tickets)
+    print(f"orders={n_orders} workers={workers} errors={errors} wall={elapsed:.2f}s throughput={n_orders / elapsed:.0f}/s")
+    print(f"round-trip p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms max={stats['max_ms']:.2f}ms "
+          f"queue-wait p95={queue_ms[int(0.95 * (len(queue_ms) - 1))]:.2f}ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--bench", type=int, default=0, help="send N orders through OrderGateway and exit")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    if args.bench:
+        run_bench(args.bench, args.latency_ms, args.jitter_ms, args.workers)
+    else:
+        print(f"Mock CoinDCX listening on http://127.0.0.1:{args.port} (key={MOCK_KEY!r} secret={MOCK_SECRET!r})")
+        MockCoinDCX(args.port, args.latency_ms, args.jitter_ms).serve_forever()
@@ -0,0 +1,94 @@
+"""NSE trading calendar: trading days, session times and the current session state.
+
+Equity trading runs 9:15-15:30 IST, Monday to Friday, except on exchange
+holidays. The holiday list below follows the NSE circulars. Extra or
+corrected dates (one YYYY-MM-DD per line) can be put in the file named by
+HARIDAS_NSE_HOLIDAYS without a code change.
+
+Bars stop changing `SETTLE` after the close. From then until the next
+trading day's pre-open, `closed_session()` names the session that just
+ended. BarStore uses it to stop re-downloading bars that are already final.
+"""
+import datetime
+import os
+
+import pytz
+
+IST = pytz.timezone('Asia/Kolkata')
+PRE_OPEN = datetime.time(9, 0)
+MARKET_OPEN = datetime.time(9, 15)
+MARKET_CLOSE = datetime.time(15, 30)
+SETTLE = datetime.timedelta(minutes=10)
+
+NSE_HOLIDAYS = {datetime.date.fromisoformat(d) for d in (
+    # 2025
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14", "2025-04-18", "2025-05-01",
+    "2025-08-15", "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22", "2025-11-05", "2025-12-25",
+    # 2026
+    "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31", "2026-04-03", "2026-04-14", "2026-05-01",
+    "2026-05-28", "2026-06-26", "2026-09-14", "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24", "2026-12-25",
+)}
+
+
+def load_holidays(path):
+    try:
+        with open(path) as fh:
+            return {datetime.date.fromisoformat(line.strip()) for line in fh if line.strip() and not line.startswith("#")}
+    except (OSError, ValueError):
+        return set()
+
+
+class NSECalendar:
+    """Session arithmetic against `clock()`, a tz-aware 'now' (the replay clock when replaying)."""
+
+    def __init__(self, holidays=None, clock=None):
+        self.holidays = set(NSE_HOLIDAYS if holidays is None else holidays)
+        if os.environ.get("HARIDAS_NSE_HOLIDAYS"): self.holidays |= load_holidays(os.environ["HARIDAS_NSE_HOLIDAYS"])
+        self.clock = clock or (lambda: datetime.datetime.now(IST))
+
+    def now(self):
+        return self.clock().astimezone(IST)
+
+    def at(self, day, t):
+        return IST.localize(datetime.datetime.combine(day, t))
+
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day not in self.holidays
+
+    def previous_trading_day(self, day):
+        day -= datetime.timedelta(days=1)
+        while not self.is_trading_day(day): day -= datetime.timedelta(days=1)
+        return day
+
+    def next_trading_day(self, day):
+        day += datetime.timedelta(days=1)
+        while not self.is_trading_day(day): day += datetime.timedelta(days=1)
+        return day
+
+    def state(self, now=None):
+        now = now or self.now()
+        if not self.is_trading_day(now.date()): return "MARKET CLOSED"
+        if now < self.at(now.date(), MARKET_OPEN): return "PRE-MARKET"
+        if now <= self.at(now.date(), MARKET_CLOSE): return "LIVE MARKET"
+        return "POST MARKET"
+
+    def session_day(self, now=None):
+        """The session scanners are about: today from its pre-open on, else the last one."""
+        now = now or self.now()
+        today = now.date()
+        if self.is_trading_day(today) and now >= self.at(today, PRE_OPEN): return today
+        return self.previous_trading_day(today)
+
+    def last_session(self, now=None):
+        """The most recent session whose bars have settled."""
+        now = now or self.now()
+        today = now.date()
+        if self.is_trading_day(today) and now >= self.at(today, MARKET_CLOSE) + SETTLE: return today
+        return self.previous_trading_day(today)
+
+    def closed_session(self, now=None):
+        """`last_session()` while nothing trades until the next pre-open, else None."""
+        now = now or self.now()
+        today = now.date()
+        if self.is_trading_day(today) and self.at(today, PRE_OPEN) <= now < self.at(today, MARKET_CLOSE) + SETTLE: return None
+        return self.last_session(now)
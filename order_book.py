@@ -0,0 +1,427 @@
+"""Incrementally maintained L2 order books for the crypto markets.
+
+Each OrderBook keeps its bids and asks as sorted `array('d')` price and
+quantity columns, limited to `keep` levels a side. A level is found by
+bisect, but inserting or deleting it shifts the arrays behind it, so an
+update is O(keep). That is a memmove of at most `keep` doubles, which is
+cheap at book depths.
+
+Books follow the Binance snapshot + diff sequencing by update id (U/u):
+- Diffs that arrive before a snapshot are buffered, then replayed on top
+  of it.
+- Diffs the snapshot already covers are dropped.
+- A gap in update ids clears the book and waits for a fresh snapshot,
+  rather than drifting silently.
+
+Sources:
+- RestDepthSource: REST depth snapshots from Binance spot or CoinDCX
+  futures.
+- BinanceDiffStream: Binance's diff-depth websocket. It needs the optional
+  `websockets` package. Without it, books are re-snapshotted every
+  `max_age` seconds instead.
+- ReplaySource: recorded snapshot/diff events from a JSON-lines file or a
+  list, for tests and offline runs.
+
+OrderBookManager keeps one book per subscribed app symbol ("BTC-USD").
+The tracker, the risk calculator and the order form read spread and depth
+from it, never calling an exchange themselves.
+"""
+import gzip
+import json
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+BINANCE_DEPTH_URL = "https://api.binance.com/api/v3/depth?symbol={symbol}&limit={limit}"
+COINDCX_DEPTH_URL = "https://public.coindcx.com/market_data/v3/orderbook/{pair}-futures/{limit}"
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/ws"
+
+
+def binance_symbol(symbol): return symbol.replace('-USD', 'USDT')
+
+
+def coindcx_pair(symbol): return f"B-{symbol.replace('-USD', '')}_USDT"
+
+
+def app_symbol(binance): return binance.upper().replace('USDT', '-USD')
+
+
+class BookSide:
+    """Levels sorted by price ascending; the bid side reads its best level from the end."""
+    __slots__ = ("prices", "qtys", "is_bid", "keep")
+
+    def __init__(self, is_bid, keep):
+        self.prices = array('d')
+        self.qtys = array('d')
+        self.is_bid = is_bid
+        self.keep = keep
+
+    def __len__(self): return len(self.prices)
+
+    def clear(self):
+        del self.prices[:]
+        del self.qtys[:]
+
+    def set(self, price, qty):
+        i = bisect_left(self.prices, price)
+        if i < len(self.prices) and self.prices[i] == price:
+            if qty > 0: self.qtys[i] = qty
+            else:
+                del self.prices[i]
+                del self.qtys[i]
+        elif qty > 0:
+            self.prices.insert(i, price)
+            self.qtys.insert(i, qty)
+            if len(self.prices) > self.keep:
+                # Drop the level furthest from the touch
+                worst = 0 if self.is_bid else -1
+                del self.prices[worst]
+                del self.qtys[worst]
+
+    def best(self):
+        if not self.prices: return None
+        i = -1 if self.is_bid else 0
+        return self.prices[i], self.qtys[i]
+
+    def levels(self, n=None):
+        """[(price, qty), ...] best first."""
+        pairs = list(zip(self.prices, self.qtys))
+        if self.is_bid: pairs.reverse()
+        return pairs if n is None else pairs[:n]
+
+
+class OrderBook:
+    def __init__(self, symbol, depth=20, keep=100, buffer_limit=1000):
+        self.symbol = symbol
+        self.depth = depth
+        self.bids = BookSide(True, keep)
+        self.asks = BookSide(False, keep)
+        self.exchange = None
+        self.update_id = None
+        self.updated_at = 0.0
+        self.diffs = self.gaps = 0
+        self.lock = threading.Lock()
+        self._pending = deque(maxlen=buffer_limit)
+
+    @property
+    def synced(self): return self.update_id is not None
+
+    def _set_levels(self, bids, asks):
+        for price, qty in bids: self.bids.set(float(price), float(qty))
+        for price, qty in asks: self.asks.set(float(price), float(qty))
+
+    def apply_snapshot(self, bids, asks, update_id, exchange=None):
+        self.bids.clear()
+        self.asks.clear()
+        self._set_levels(bids, asks)
+        self.exchange = exchange or self.exchange
+        self.update_id = int(update_id)
+        self.updated_at = time.monotonic()
+        pending, self._pending = list(self._pending), deque(maxlen=self._pending.maxlen)
+        for diff in pending: self.apply_diff(*diff)
+
+    def apply_diff(self, first_id, final_id, bids, asks):
+        """False when the diff can't be applied yet (no snapshot, or a gap that needs one)."""
+        if self.update_id is None:
+            self._pending.append((first_id, final_id, bids, asks))
+            return False
+        if final_id <= self.update_id: return True
+        if first_id > self.update_id + 1:
+            self.gaps += 1
+            self.update_id = None
+            self.bids.clear()
+            self.asks.clear()
+            self._pending.append((first_id, final_id, bids, asks))
+            return False
+        self._set_levels(bids, asks)
+        self.update_id = int(final_id)
+        self.updated_at = time.monotonic()
+        self.diffs += 1
+        return True
+
+    def touch(self):
+        """(best bid, best ask), or None while either side is empty."""
+        bid, ask = self.bids.best(), self.asks.best()
+        return (bid[0], ask[0]) if bid and ask else None
+
+    def fill_price(self, side, qty):
+        """(VWAP, filled qty) for a market order of `qty` walking the opposite side."""
+        levels = self.asks.levels() if side == "BUY" else self.bids.levels()
+        cost = filled = 0.0
+        for price, level_qty in levels:
+            take = min(level_qty, qty - filled)
+            cost += take * price
+            filled += take
+            if filled >= qty: break
+        return (cost / filled if filled else 0.0), filled
+
+    def quote(self, side=None, qty=0.0):
+        touch = self.touch()
+        if touch is None: return None
+        bid, ask = touch
+        mid = (bid + ask) / 2
+        quote = {"Bid": bid, "Ask": ask, "Mid": mid, "Spread": ask - bid, "Spread bps": (ask - bid) / mid * 10000 if mid else 0.0,
+                 "Bid Depth": sum(q for _, q in self.bids.levels(self.depth)), "Ask Depth": sum(q for _, q in self.asks.levels(self.depth)),
+                 "Exchange": self.exchange}
+        if side and qty > 0:
+            vwap, filled = self.fill_price(side, qty)
+            touch_price = ask if side == "BUY" else bid
+            quote.update({"Fill": vwap, "Filled Qty": filled, "Slippage bps": abs(vwap - touch_price) / touch_price * 10000 if vwap and touch_price else 0.0})
+        return quote
+
+
+def parse_binance_depth(res):
+    return res['bids'], res['asks'], res['lastUpdateId']
+
+
+def parse_coindcx_depth(res):
+    # Levels come as {"price": "qty"} maps with a version counter instead of update ids
+    return list(res['bids'].items()), list(res['asks'].items()), res.get('vs', 0)
+
+
+class RestDepthSource:
+    """Depth snapshots over REST, trying `exchanges` in order until one lists the market."""
+    URLS = {"binance": (BINANCE_DEPTH_URL, binance_symbol, parse_binance_depth),
+            "coindcx": (COINDCX_DEPTH_URL, coindcx_pair, parse_coindcx_depth)}
+
+    def __init__(self, exchanges=("binance", "coindcx"), limit=50, timeout=2):
+        self.exchanges = exchanges
+        self.limit = limit
+        self.timeout = timeout
+
+    def snapshot(self, symbol, exchange=None):
+        """(exchange, bids, asks, update_id); LookupError if no exchange answers."""
+        for name in ([exchange] if exchange else self.exchanges):
+            url, to_market, parse = self.URLS[name]
+            key = "pair" if name == "coindcx" else "symbol"
+            try:
+                res = requests.get(url.format(**{key: to_market(symbol), "limit": self.limit}), timeout=self.timeout).json()
+                bids, asks, update_id = parse(res)
+                if bids or asks: return name, bids, asks, update_id
+            except Exception: continue
+        raise LookupError(f"No order book for {symbol}")
+
+
+class ReplaySource:
+    """Book events replayed from a JSON-lines file (optionally gzipped) or a list.
+
+    Events: {"symbol", "type": "snapshot", "bids", "asks", "u"} or
+    {"symbol", "type": "diff", "U", "u", "bids", "asks"}. As a snapshot
+    source it serves the last snapshot seen for a symbol.
+    """
+
+    def __init__(self, events):
+        self._events = events
+        self._snapshots = {}
+
+    def events(self):
+        if isinstance(self._events, str):
+            opener = gzip.open if self._events.endswith(".gz") else open
+            with opener(self._events, "rt") as fh:
+                for line in fh:
+                    if line.strip(): yield json.loads(line)
+        else:
+            yield from self._events
+
+    def play(self, manager):
+        for event in self.events():
+            if event.get("type") == "snapshot": self._snapshots[event['symbol']] = event
+            manager.apply(event)
+
+    def snapshot(self, symbol, exchange=None):
+        event = self._snapshots.get(symbol)
+        if event is None: raise LookupError(f"No recorded snapshot for {symbol}")
+        return event.get("exchange", "replay"), event['bids'], event['asks'], event['u']
+
+
+def write_events(path, events):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt") as fh:
+        for event in events: fh.write(json.dumps(event) + "\n")
+
+
+class BinanceDiffStream:
+    """Binance diff-depth websocket; each depthUpdate is passed to `on_event` as a diff event."""
+
+    def __init__(self, on_event, url=BINANCE_STREAM_URL, reconnect_delay=5.0):
+        self.on_event = on_event
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.available = True
+        self.connected = False
+        self.symbols = set()
+        self._new = deque()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, symbol):
+        """False if the stream can't run here (no `websockets`), so the caller polls instead."""
+        if not self.available: return False
+        with self._lock:
+            if symbol not in self.symbols:
+                self.symbols.add(symbol)
+                self._new.append(symbol)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="depth-stream", daemon=True)
+                self._thread.start()
+        return True
+
+    def _run(self):
+        try: from websockets.sync.client import connect
+        except ImportError:
+            self.available = False
+            return
+        while True:
+            try:
+                with connect(self.url, open_timeout=5) as ws:
+                    with self._lock:
+                        self._new = deque(self.symbols)
+                    self.connected = True
+                    request_id = 0
+                    while True:
+                        if self._new:
+                            with self._lock: params, self._new = [f"{binance_symbol(s).lower()}@depth@100ms" for s in self._new], deque()
+                            request_id += 1
+                            ws.send(json.dumps({"method": "SUBSCRIBE", "params": params, "id": request_id}))
+                        try: message = json.loads(ws.recv(timeout=0.5))
+                        except TimeoutError: continue
+                        if message.get('e') != 'depthUpdate': continue
+                        self.on_event({"symbol": app_symbol(message['s']), "type": "diff", "U": message['U'], "u": message['u'],
+                                       "bids": message['b'], "asks": message['a']})
+            except Exception:
+                logger.debug("Depth stream disconnected", exc_info=True)
+            self.connected = False
+            time.sleep(self.reconnect_delay)
+
+
+class OrderBookManager:
+    """One OrderBook per subscribed symbol, kept current from `source` snapshots and `stream` diffs.
+
+    A symbol is subscribed the first time it is asked for. While its diffs
+    are arriving on the stream, they keep the book current and a snapshot is
+    fetched only to (re)sync it. Otherwise it is re-snapshotted when older
+    than `max_age`. Markets no source could serve are not retried for
+    `retry_after` seconds. Snapshots are fetched without holding the book's
+    lock; a gap seen on the stream is resynced on a worker thread.
+
+    `quote()` and `book()` may wait for a snapshot. `touch()` and
+    `quote(..., wait=False)` never do: they answer from the book as it
+    stands (if under `stale_after` seconds old) and refresh it in the
+    background.
+    """
+
+    def __init__(self, source, stream=None, depth=20, keep=100, max_age=3.0, stale_after=30.0, retry_after=30.0):
+        self.source = source
+        self.stream = stream
+        self.depth = depth
+        self.keep = keep
+        self.max_age = max_age
+        self.stale_after = stale_after
+        self.retry_after = retry_after
+        self.snapshots = 0
+        self._books = {}
+        self._failed = {}
+        self._refreshing = set()
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="book-refresh")
+        self._lock = threading.Lock()
+
+    def _get(self, symbol):
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None: book = self._books[symbol] = OrderBook(symbol, self.depth, self.keep)
+            return book
+
+    def _snapshot(self, book, exchange=None):
+        """Fetch and apply a snapshot; must not be called with book.lock held."""
+        if time.monotonic() - self._failed.get(book.symbol, -self.retry_after) < self.retry_after: return
+        try: name, bids, asks, update_id = self.source.snapshot(book.symbol, exchange)
+        except Exception:
+            self._failed[book.symbol] = time.monotonic()
+            return
+        with self._lock: self.snapshots += 1
+        self._failed.pop(book.symbol, None)
+        with book.lock:
+            # A slower snapshot must not roll back a book that moved on while it was in flight
+            if book.synced and book.exchange == name and int(update_id) < book.update_id: return
+            book.apply_snapshot(bids, asks, update_id, name)
+
+    def _streamed(self, book):
+        """Called with book.lock held: the book is synced and its diffs are arriving on the stream."""
+        return (self.stream is not None and self.stream.connected and book.symbol in self.stream.symbols
+                and book.exchange == "binance" and book.synced and time.monotonic() - book.updated_at < self.stale_after)
+
+    def apply(self, event):
+        """Feed one snapshot/diff event (from a stream or a ReplaySource)."""
+        book = self._get(event['symbol'])
+        with book.lock:
+            if event['type'] == "snapshot":
+                book.apply_snapshot(event['bids'], event['asks'], event['u'], event.get("exchange"))
+                self._failed.pop(book.symbol, None)
+                return
+            # Out of sync: the book is cleared and buffers diffs until a fresh snapshot lands
+            in_sync = book.apply_diff(event['U'], event['u'], event['bids'], event['asks'])
+            exchange = book.exchange
+        if not in_sync: self._in_background(book.symbol, lambda: self._resync(book, exchange))
+
+    def _resync(self, book, exchange):
+        with book.lock:
+            if book.synced: return
+        self._snapshot(book, exchange)
+
+    def book(self, symbol):
+        """The symbol's OrderBook, subscribing on first use; None until it has both sides."""
+        book = self._get(symbol)
+        with book.lock: stale = not self._streamed(book) and (not book.synced or time.monotonic() - book.updated_at >= self.max_age)
+        if stale:
+            self._snapshot(book)
+            if book.exchange == "binance" and self.stream is not None: self.stream.subscribe(symbol)
+        with book.lock: return book if book.synced and book.touch() else None
+
+    def _in_background(self, symbol, fn):
+        # At most one refresh/resync per symbol queued at a time
+        with self._lock:
+            if symbol in self._refreshing: return
+            self._refreshing.add(symbol)
+
+        def run():
+            try: fn()
+            finally:
+                with self._lock: self._refreshing.discard(symbol)
+        self._pool.submit(run)
+
+    def touch(self, symbol):
+        """(best bid, best ask) without waiting on the network; None if there is no usable book yet."""
+        book = self._get(symbol)
+        with book.lock: return book.touch() if self._usable(book) else None
+
+    def _usable(self, book):
+        """Called with book.lock held: whether to answer from the book now; queues a refresh when stale."""
+        age = time.monotonic() - book.updated_at
+        streamed = self._streamed(book)
+        if not streamed and (not book.synced or age >= self.max_age):
+            self._in_background(book.symbol, lambda: self.book(book.symbol))
+        return book.synced and (streamed or age < self.stale_after)
+
+    def quote(self, symbol, side=None, qty=0.0, wait=True):
+        """Spread, depth and (with side/qty) the expected fill; `wait=False` never touches the network."""
+        if wait:
+            book = self.book(symbol)
+            if book is None: return None
+        else: book = self._get(symbol)
+        with book.lock:
+            if not wait and not self._usable(book): return None
+            return book.quote(side, qty)
+
+    def stats(self):
+        with self._lock: books = list(self._books.values())
+        return {"Books": len(books), "Synced": sum(b.synced for b in books), "Snapshots": self.snapshots,
+                "Diffs": sum(b.diffs for b in books), "Gaps": sum(b.gaps for b in books),
+                "Streaming": bool(self.stream and self.stream.connected)}
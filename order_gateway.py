@@ -0,0 +1,140 @@
+"""CoinDCX order gateway.
+
+Orders are queued with an idempotent client order id and sent by a worker
+thread over one keep-alive HTTPS session, so the Streamlit form handler never
+signs or blocks on the network itself. Every order records its queue wait and
+exchange round-trip time.
+
+Only in-flight and accepted orders are remembered by client id. A rejected
+or failed order is forgotten, so resubmitting it sends it again. The same
+client id goes to CoinDCX, which refuses a duplicate if the first attempt
+did get through.
+"""
+import hashlib
+import hmac
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import requests
+
+COINDCX_BASE_URL = os.environ.get("COINDCX_BASE_URL", "https://api.coindcx.com")
+CREATE_ORDER_PATH = "/exchange/v1/orders/create"
+
+
+def to_dcx_market(symbol):
+    return f"B-{symbol.replace('-USD', '_USDT')}"
+
+
+class OrderTicket:
+    __slots__ = ("client_order_id", "body", "future", "queued_at", "sent_at", "done_at")
+
+    def __init__(self, client_order_id, body):
+        self.client_order_id = client_order_id
+        self.body = body
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+        self.sent_at = None
+        self.done_at = None
+
+    @property
+    def queue_ms(self):
+        return (self.sent_at - self.queued_at) * 1000 if self.sent_at else None
+
+    @property
+    def round_trip_ms(self):
+        return (self.done_at - self.sent_at) * 1000 if self.done_at and self.sent_at else None
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+
+class OrderGateway:
+    """Queue-backed order sender with a pre-keyed HMAC and keep-alive session.
+
+    `submit()` returns immediately with an OrderTicket; repeated submits with
+    the same client order id return the original ticket while it is in
+    flight or was accepted, for up to `ticket_ttl` seconds and the last
+    `max_tickets` orders.
+    """
+
+    def __init__(self, key, secret, base_url=None, timeout=5, workers=2, history=200, max_tickets=500, ticket_ttl=3600):
+        self.key = key
+        self.base_url = (base_url or COINDCX_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({'X-AUTH-APIKEY': key, 'Content-Type': 'application/json'})
+        self._mac = hmac.new(bytes(secret, 'utf-8'), digestmod=hashlib.sha256)
+        self._queue = queue.Queue()
+        self.max_tickets = max_tickets
+        self.ticket_ttl = ticket_ttl
+        self._tickets = OrderedDict()
+        self._lock = threading.Lock()
+        self.completed = deque(maxlen=history)
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"order-gateway-{i}", daemon=True).start()
+
+    def warm(self):
+        # Opens the TLS connection ahead of the first order
+        try: self.session.head(self.base_url, timeout=self.timeout)
+        except requests.RequestException: pass
+        return self
+
+    def submit(self, market, side, order_type, price, quantity, client_order_id=None):
+        client_order_id = client_order_id or uuid.uuid4().hex
+        with self._lock:
+            ticket = self._tickets.get(client_order_id)
+            if ticket is not None: return ticket
+            body = {"side": side.lower(), "order_type": order_type, "market": to_dcx_market(market),
+                    "price_per_unit": price, "total_quantity": quantity, "client_order_id": client_order_id}
+            ticket = self._tickets[client_order_id] = OrderTicket(client_order_id, body)
+            self._prune()
+        self._queue.put(ticket)
+        return ticket
+
+    def _prune(self):
+        # Oldest first; in-flight tickets are kept so a resubmit can't double-send
+        cutoff = time.perf_counter() - self.ticket_ttl
+        for client_order_id, ticket in list(self._tickets.items()):
+            if len(self._tickets) <= self.max_tickets and ticket.queued_at >= cutoff: break
+            if ticket.future.done(): del self._tickets[client_order_id]
+
+    def _forget(self, ticket):
+        with self._lock:
+            if self._tickets.get(ticket.client_order_id) is ticket: del self._tickets[ticket.client_order_id]
+
+    def sign(self, body):
+        json_body = json.dumps(body, separators=(',', ':'))
+        mac = self._mac.copy()
+        mac.update(json_body.encode())
+        return json_body, mac.hexdigest()
+
+    def latency_stats(self):
+        with self._lock: samples = sorted(t.round_trip_ms for t in self.completed if t.round_trip_ms is not None)
+        if not samples: return {}
+        pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+        return {"orders": len(samples), "p50_ms": pick(0.50), "p95_ms": pick(0.95), "max_ms": samples[-1]}
+
+    def _run(self):
+        while True:
+            ticket = self._queue.get()
+            body = dict(ticket.body, timestamp=int(round(time.time() * 1000)))
+            json_body, signature = self.sign(body)
+            ticket.sent_at = time.perf_counter()
+            try:
+                res = self.session.post(self.base_url + CREATE_ORDER_PATH, data=json_body,
+                                        headers={'X-AUTH-SIGNATURE': signature}, timeout=self.timeout)
+                result = res.json()
+                if not res.ok and "error" not in result:
+                    result = dict(result, error=result.get("message") or f"HTTP {res.status_code}")
+            except Exception as e:
+                result = {"error": str(e)}
+            ticket.done_at = time.perf_counter()
+            with self._lock: self.completed.append(ticket)
+            if "error" in result: self._forget(ticket)
+            ticket.future.set_result(result)
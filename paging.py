@@ -0,0 +1,51 @@
+"""Server-side pagination for the trade tables.
+
+Filtered row lists and rendered HTML pages are memoised by the trade book's
+version, so a rerun that didn't change the book costs one dict lookup and
+the page sent to the browser is never longer than `page_size` rows. The CSV
+export is built only when the download button is clicked.
+"""
+import csv
+import io
+import threading
+from collections import OrderedDict
+
+
+class PageCache:
+    """Small LRU keyed by (table, filter, version, page, page size)."""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = build()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+        return value
+
+
+def page_bounds(total, page, page_size):
+    """(start, end, page, pages) with `page` clamped to 1..pages."""
+    pages = max(1, -(-total // page_size))
+    page = min(max(1, int(page)), pages)
+    return (page - 1) * page_size, min(total, page * page_size), page, pages
+
+
+def csv_export(rows):
+    """CSV bytes of `rows` (dicts); NaN cells are written empty."""
+    fields = list(dict.fromkeys(k for r in rows for k in r))
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields, lineterminator="\n")
+    writer.writeheader()
+    for row in rows: writer.writerow({k: "" if isinstance(v, float) and v != v else v for k, v in row.items()})
+    return buf.getvalue().encode('utf-8')
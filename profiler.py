@@ -0,0 +1,156 @@
+"""Sampling profiler for a single app.py run.
+
+Samples, at a fixed interval, the Python stack of the thread that started
+the profiler and of the ThreadPoolExecutor workers it (or those workers)
+start while the profile runs. Long-lived shared pools are named threads
+and are never adopted, so other browser sessions' work stays out of the
+profile. Output is the collapsed-stack format read by flamegraph.pl and
+speedscope, plus a per-function summary split into network wait, lock wait
+and CPU.
+"""
+import datetime
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+NET_FILES = ("socket.py", "ssl.py", "selectors.py", os.path.join("http", "client.py"))
+NET_PACKAGES = ("urllib3", "requests", "curl_cffi")
+WAIT_FUNCS = {"wait", "acquire", "_wait_for_tstate_lock", "join", "result", "get"}
+# Per-call executors keep the default name; shared pools and services set their own
+RUN_THREAD_PREFIXES = ("ThreadPoolExecutor-",)
+_active = set()
+_hook_lock = threading.Lock()
+_original_start = threading.Thread.start
+
+
+def _tracked_start(thread):
+    parent = threading.get_ident()
+    _original_start(thread)
+    for profiler in list(_active): profiler._adopt(parent, thread)
+
+
+def _install(profiler):
+    # Thread.start is only wrapped while some profiler is running
+    with _hook_lock:
+        _active.add(profiler)
+        threading.Thread.start = _tracked_start
+
+
+def _uninstall(profiler):
+    with _hook_lock:
+        _active.discard(profiler)
+        if not _active: threading.Thread.start = _original_start
+
+
+def _classify(leaf_code):
+    filename = leaf_code.co_filename
+    if filename.endswith(NET_FILES) or any(f"{os.sep}{pkg}{os.sep}" in filename for pkg in NET_PACKAGES): return "network"
+    if filename.endswith(("threading.py", "queue.py", os.path.join("concurrent", "futures", "_base.py"))) and leaf_code.co_name in WAIT_FUNCS: return "wait"
+    return "cpu"
+
+
+def _qualname(code):
+    return getattr(code, "co_qualname", code.co_name)
+
+
+class SamplingProfiler:
+    """Collects folded stacks from the starting thread and its descendants until `stop()`.
+
+    `tracked` names top-level functions (e.g. the scanners); a sample is
+    attributed to the outermost tracked function on its stack, which also
+    catches their nested worker closures (`run_nse_strategy.<locals>...`).
+    Sampling ends on its own after `max_duration` seconds if `stop()` is
+    never reached.
+    """
+
+    def __init__(self, tracked=(), interval=0.005, max_duration=300):
+        self.tracked = set(tracked)
+        self.interval = interval
+        self.max_duration = max_duration
+        self.wall = None
+        self.stacks = Counter()
+        self.attribution = defaultdict(Counter)
+        self.samples = 0
+        self._threads = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self.root = threading.get_ident()
+        self._threads = {self.root}
+        _install(self)
+        self.started_at = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self.wall is not None: return self
+        self._stop.set()
+        self._thread.join()
+        self.wall = time.perf_counter() - self.started_at
+        self.cpu = time.process_time() - self.cpu_started
+        return self
+
+    def _adopt(self, parent, thread):
+        # A reused ident from someone else's thread is dropped rather than inherited
+        if parent in self._threads and thread.name.startswith(RUN_THREAD_PREFIXES): self._threads.add(thread.ident)
+        elif thread.ident != self.root: self._threads.discard(thread.ident)
+
+    def _run(self):
+        deadline = self.started_at + self.max_duration
+        try:
+            while not self._stop.wait(self.interval) and time.perf_counter() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id in self._threads: self._record(names.get(thread_id, str(thread_id)), frame)
+                self.samples += 1
+        finally:
+            _uninstall(self)
+            self._threads = set()
+
+    def _record(self, thread_name, frame):
+        leaf_code = frame.f_code
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        stack.reverse()
+
+        kind = _classify(leaf_code)
+        owner = "script" if thread_name.startswith("ScriptRunner") else None
+        for code in stack:
+            top = _qualname(code).split(".")[0]
+            if top in self.tracked:
+                owner = top
+                break
+        if owner is not None: self.attribution[owner][kind] += 1
+
+        thread_label = thread_name.rsplit("_", 1)[0] if "ThreadPoolExecutor" in thread_name else thread_name
+        folded = ";".join([thread_label] + [f"{os.path.basename(c.co_filename)}:{_qualname(c)}" for c in stack])
+        self.stacks[folded] += 1
+
+    def write_folded(self, directory="profiles"):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"run_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.folded")
+        with open(path, "w") as fh:
+            for stack, count in self.stacks.most_common(): fh.write(f"{stack} {count}\n")
+        return path
+
+    def summary(self):
+        """Rows of {Function, Time (s), Network %, Wait %, CPU %}, busiest first.
+
+        Times are sample counts scaled to wall time, so functions running
+        in parallel workers can add up to more than the run's wall time.
+        """
+        per_sample = self.wall / self.samples if self.samples else self.interval
+        rows = []
+        for owner, kinds in self.attribution.items():
+            total = sum(kinds.values())
+            rows.append({"Function": owner, "Time (s)": round(total * per_sample, 2),
+                         "Network %": round(kinds['network'] * 100 / total, 1),
+                         "Wait %": round(kinds['wait'] * 100 / total, 1),
+                         "CPU %": round(kinds['cpu'] * 100 / total, 1)})
+        return sorted(rows, key=lambda r: r["Time (s)"], reverse=True)
@@ -0,0 +1,73 @@
+"""Portfolio risk engine.
+
+Applies the Futures Risk Calculator's sizing formulas to every active trade
+and live signal in one vectorized pass, and aggregates exposure per sector
+and side. Cheap enough to rerun on every quote snapshot.
+"""
+import numpy as np
+import pandas as pd
+
+RISK_COLUMNS = ["Kind", "Stock", "Sector", "Side", "Entry", "SL", "LTP", "Qty", "Notional", "Margin",
+                "Liq Price", "Risk Amt", "Points", "P&L %", "P&L Amt"]
+
+
+def position_risk(entry, stop, capital, risk_pct, leverage, is_long):
+    """Single-trade sizing used by the calculator page; None if entry == stop."""
+    price_diff = abs(entry - stop)
+    if price_diff <= 0: return None
+    risk_amt = capital * (risk_pct / 100)
+    pos_size_coin = risk_amt / price_diff
+    pos_size_usdt = pos_size_coin * entry
+    margin_required = pos_size_usdt / leverage
+    liq_price = entry * (1 - (1/leverage)) if is_long else entry * (1 + (1/leverage))
+    return {"Qty": pos_size_coin, "Notional": pos_size_usdt, "Margin": margin_required, "Liq Price": liq_price, "Risk Amt": risk_amt}
+
+
+def build_positions(active_trades, live_signals, sector_of):
+    rows = []
+    for kind, items in (("ACTIVE", active_trades), ("SIGNAL", live_signals)):
+        for t in items:
+            rows.append({"Kind": kind, "Stock": t['Stock'], "Sector": sector_of(t['Stock']),
+                         "Side": "LONG" if t['Signal'] == 'BUY' else "SHORT",
+                         "Entry": float(t['Entry']), "SL": float(t['SL'])})
+    return pd.DataFrame(rows, columns=["Kind", "Stock", "Sector", "Side", "Entry", "SL"])
+
+
+def portfolio_risk(positions, quotes, capital, risk_pct, leverage):
+    """Returns (per-position frame, exposure per sector/side frame).
+
+    `quotes` maps symbol -> last price; a missing or zero quote falls back to
+    the entry price so the row still shows its size and margin.
+    """
+    if positions.empty:
+        return pd.DataFrame(columns=RISK_COLUMNS), pd.DataFrame(columns=["Kind", "Sector", "Side", "Positions", "Notional", "Margin", "Risk Amt", "P&L Amt"])
+
+    df = positions.copy()
+    entry, stop = df['Entry'].to_numpy(float), df['SL'].to_numpy(float)
+    is_long = (df['Side'] == "LONG").to_numpy()
+    direction = np.where(is_long, 1.0, -1.0)
+
+    ltp = df['Stock'].map(quotes).fillna(0.0).to_numpy(float)
+    ltp = np.where(ltp > 0, ltp, entry)
+
+    price_diff = np.abs(entry - stop)
+    risk_amt = capital * (risk_pct / 100)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        qty = np.where(price_diff > 0, risk_amt / price_diff, 0.0)
+        pnl_pct = np.where(entry > 0, (ltp - entry) * direction / entry * 100, 0.0)
+    points = (ltp - entry) * direction
+
+    df['LTP'] = ltp
+    df['Qty'] = qty
+    df['Notional'] = qty * entry
+    df['Margin'] = df['Notional'] / leverage
+    df['Liq Price'] = np.where(is_long, entry * (1 - (1/leverage)), entry * (1 + (1/leverage)))
+    df['Risk Amt'] = np.where(qty > 0, risk_amt, 0.0)
+    df['Points'] = points
+    df['P&L %'] = pnl_pct
+    df['P&L Amt'] = points * qty
+
+    exposure = (df.groupby(['Kind', 'Sector', 'Side'], as_index=False)
+                .agg(Positions=('Stock', 'count'), Notional=('Notional', 'sum'), Margin=('Margin', 'sum'),
+                     **{"Risk Amt": ('Risk Amt', 'sum'), "P&L Amt": ('P&L Amt', 'sum')}))
+    return df[RISK_COLUMNS], exposure.sort_values(by=['Kind', 'Notional'], ascending=[True, False])
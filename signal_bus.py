@@ -0,0 +1,108 @@
+"""In-process event bus for signals, trade triggers and SL/target hits.
+
+Publishers (the background signal monitor, the page render, the manual
+journal) push events; subscribers (trade tracker, journal, notifier, UI feed)
+react as soon as the event is published instead of waiting for the next
+browser refresh.
+"""
+import datetime
+import itertools
+import logging
+import os
+import queue
+import threading
+from collections import defaultdict, deque
+
+import pytz
+import requests
+
+TOPIC_SCAN = "scan"
+TOPIC_SIGNAL = "signal"
+TOPIC_TRADE_OPEN = "trade_open"
+TOPIC_TRADE_CLOSE = "trade_close"
+TOPIC_JOURNAL = "journal"
+ALL_TOPICS = "*"
+
+logger = logging.getLogger(__name__)
+
+
+class EventBus:
+    """Topic based pub/sub.
+
+    Inline subscribers run in the publisher's thread, so a trade is opened in
+    the same tick its signal is published. Subscribers registered with
+    `inline=False` (network calls, slow consumers) run on the bus worker
+    thread and can never stall a publisher.
+    """
+
+    def __init__(self, history=200):
+        self._subs = defaultdict(list)
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=history)
+        self._seq = itertools.count(1)
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._drain, name="event-bus", daemon=True)
+        self._worker.start()
+
+    def subscribe(self, topic, handler, inline=True):
+        with self._lock:
+            self._subs[topic].append((handler, inline))
+        return handler
+
+    def unsubscribe(self, topic, handler):
+        with self._lock:
+            self._subs[topic] = [s for s in self._subs[topic] if s[0] is not handler]
+
+    def publish(self, topic, payload):
+        event = {"seq": next(self._seq), "topic": topic, "ts": datetime.datetime.now(pytz.timezone('Asia/Kolkata')), "payload": payload}
+        with self._lock:
+            self._recent.append(event)
+            handlers = list(self._subs[topic]) + list(self._subs[ALL_TOPICS])
+        for handler, inline in handlers:
+            if inline: self._call(handler, event)
+            else: self._queue.put((handler, event))
+        return event
+
+    def recent(self, topics=None, limit=20):
+        with self._lock:
+            events = [e for e in self._recent if topics is None or e['topic'] in topics]
+        return events[-limit:][::-1]
+
+    def _call(self, handler, event):
+        try: handler(event)
+        except Exception: logger.exception("Event handler failed for %s", event['topic'])
+
+    def _drain(self):
+        while True:
+            handler, event = self._queue.get()
+            self._call(handler, event)
+
+
+def describe_event(event):
+    p = event['payload']
+    if event['topic'] == TOPIC_SIGNAL:
+        return f"🎯 {p['Signal']} signal on {p['Stock']} @ {p['Entry']:.4f} (SL {p['SL']:.4f})"
+    if event['topic'] == TOPIC_TRADE_OPEN:
+        return f"✅ Trade triggered: {p['Signal']} {p['Stock']} @ {p['Entry']:.4f}"
+    if event['topic'] == TOPIC_TRADE_CLOSE:
+        return f"{p['Status']}: {p['Stock']} {p['Signal']} exit {p['Exit']:.4f} ({p['P&L %']:+.2f}%)"
+    if event['topic'] == TOPIC_JOURNAL:
+        return f"📝 Journal: {p['Signal']} {p['Stock']} ({p['P&L %']:+.2f}%)"
+    return event['topic']
+
+
+class WebhookNotifier:
+    """Outbound notifier posting every trade event to a JSON webhook."""
+
+    def __init__(self, url=None, timeout=5):
+        self.url = url or os.environ.get("HARIDAS_WEBHOOK_URL", "")
+        self.timeout = timeout
+
+    def attach(self, bus):
+        if not self.url: return self
+        for topic in (TOPIC_SIGNAL, TOPIC_TRADE_OPEN, TOPIC_TRADE_CLOSE):
+            bus.subscribe(topic, self.notify, inline=False)
+        return self
+
+    def notify(self, event):
+        requests.post(self.url, json={"text": describe_event(event), "topic": event['topic'], "payload": event['payload']}, timeout=self.timeout)
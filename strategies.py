@@ -0,0 +1,227 @@
+"""Indicator graph and strategy registry shared by the scanners and the backtest.
+
+Indicators are declared once, each with the columns it is derived from. An
+IndicatorFrame computes a node the first time it is read, dependencies
+first, and keeps it. SMA_20, the Bollinger bands and the Heikin-Ashi
+series are therefore built once per (symbol, interval) frame, however many
+strategies read them. IndicatorCache hands out the same frame until the
+bars change. A scanner rerun on unchanged bars does no indicator work.
+
+A strategy is a vectorised rule over an IndicatorFrame. It returns one
+value per bar: +1 for BUY, -1 for SHORT and 0 for no signal. Its output is
+memoised on the frame like any indicator. The live scanners read it at the
+last completed bar and the backtest reads it at every bar. Adding a
+strategy costs only its own rule.
+"""
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+INDICATORS = {}
+STRATEGIES = {}
+
+
+def indicator(name, *deps):
+    """Register `fn(frame) -> Series` as indicator `name`, computed after `deps`."""
+    def register(fn):
+        INDICATORS[name] = (fn, deps)
+        return fn
+    return register
+
+
+@indicator("SMA_20")
+def _sma_20(f): return f['Close'].rolling(window=20).mean()
+
+
+@indicator("STD_20")
+def _std_20(f): return f['Close'].rolling(window=20).std()
+
+
+@indicator("Upper_BB", "SMA_20", "STD_20")
+def _upper_bb(f): return f['SMA_20'] + (2 * f['STD_20'])
+
+
+@indicator("Lower_BB", "SMA_20", "STD_20")
+def _lower_bb(f): return f['SMA_20'] - (2 * f['STD_20'])
+
+
+@indicator("HA_Close")
+def _ha_close(f): return (f['Open'] + f['High'] + f['Low'] + f['Close']) / 4
+
+
+@indicator("HA_Open", "HA_Close")
+def _ha_open(f):
+    # HA_Open[i] = (HA_Open[i-1] + HA_Close[i-1]) / 2 from the first Open, i.e. an EWM with alpha 1/2
+    if not len(f): return f['HA_Close'].copy()
+    seed = f['HA_Close'].shift(1, fill_value=f['Open'].iloc[0])
+    return seed.ewm(alpha=0.5, adjust=False).mean()
+
+
+@indicator("HA_High", "HA_Open", "HA_Close")
+def _ha_high(f): return pd.concat([f['High'], f['HA_Open'], f['HA_Close']], axis=1).max(axis=1)
+
+
+@indicator("HA_Low", "HA_Open", "HA_Close")
+def _ha_low(f): return pd.concat([f['Low'], f['HA_Open'], f['HA_Close']], axis=1).min(axis=1)
+
+
+@indicator("Trend_3")
+def _trend_3(f):
+    # +1 on the third green candle in a row, -1 on the third red one
+    green = (f['Close'] > f['Open']).astype(int).rolling(3).sum() == 3
+    red = (f['Close'] < f['Open']).astype(int).rolling(3).sum() == 3
+    return green.astype(int) - red.astype(int)
+
+
+class IndicatorFrame:
+    """OHLCV bars plus indicator and strategy columns computed on first access."""
+
+    def __init__(self, bars):
+        self.index = bars.index
+        self.columns = {c: bars[c] for c in bars.columns}
+        self.computed = 0
+        self._lock = threading.RLock()
+
+    def __len__(self): return len(self.index)
+
+    def __contains__(self, name): return name in self.columns
+
+    def __getitem__(self, name):
+        column = self.columns.get(name)
+        if column is not None: return column
+        with self._lock:
+            if name not in self.columns:
+                if name in STRATEGIES: fn, deps = STRATEGIES[name].rule, STRATEGIES[name].needs
+                else: fn, deps = INDICATORS[name]
+                for dep in deps: self[dep]
+                self.columns[name] = fn(self)
+                self.computed += 1
+            return self.columns[name]
+
+    def row(self, i, *names):
+        return {n: self[n].iloc[i] for n in names}
+
+    def frame(self, *names):
+        return pd.DataFrame({n: self[n] for n in names}, index=self.index)
+
+
+class IndicatorCache:
+    """IndicatorFrames by key (symbol, interval, days), reused while the bars are unchanged."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(bars):
+        if bars.empty: return (0,)
+        last = bars.iloc[-1]
+        return (len(bars), bars.index[0], bars.index[-1], *(float(last[c]) for c in ("Open", "High", "Low", "Close") if c in bars.columns))
+
+    def get(self, key, bars):
+        fingerprint = self._fingerprint(bars)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        frame = IndicatorFrame(bars)
+        with self._lock:
+            self._entries[key] = (fingerprint, frame)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+        return frame
+
+    def stats(self):
+        with self._lock:
+            frames = [f for _, f in self._entries.values()]
+        return {"Frames": len(frames), "Hits": self.hits, "Misses": self.misses, "Columns Built": sum(f.computed for f in frames)}
+
+
+class Strategy:
+    """A registered rule: `rule(frame)` -> Series of +1 (BUY), -1 (SHORT), 0 per bar.
+
+    `interval`/`days` say which bars the scanners feed it; `buffer(candle)`
+    pads entry and SL beyond the alert candle's range.
+    """
+    __slots__ = ("name", "market", "rule", "needs", "interval", "days", "buffer", "time_format", "min_bars")
+
+    def __init__(self, name, market, rule, needs, interval, days, buffer, time_format, min_bars=25):
+        self.name, self.market, self.rule, self.needs = name, market, rule, needs
+        self.interval, self.days = interval, days
+        self.buffer, self.time_format, self.min_bars = buffer, time_format, min_bars
+
+
+def strategy(name, market, needs, interval, days, buffer, time_format, min_bars=25):
+    def register(fn):
+        STRATEGIES[name] = Strategy(name, market, fn, needs, interval, days, buffer, time_format, min_bars)
+        return fn
+    return register
+
+
+def strategies_for(market):
+    return [s for s in STRATEGIES.values() if s.market == market]
+
+
+def _side(short, buy):
+    # SHORT wins when both fire, as the scanners' if/elif always did
+    return (buy & ~short).astype(int) - short.astype(int)
+
+
+HA_BB = ("HA_High", "HA_Low", "HA_Open", "HA_Close", "Upper_BB", "Lower_BB")
+
+
+@strategy("HA_BB_REVERSAL_5M", "NSE", HA_BB, "5m", 5, buffer=lambda candle: 0.10, time_format='%H:%M')
+def ha_bb_reversal_confirmed(f):
+    """HA candle pierced a band, then the next one closes back inside it in the reversal colour."""
+    short = (f['HA_High'].shift(1) >= f['Upper_BB'].shift(1)) & (f['HA_Close'] < f['HA_Open']) & (f['HA_High'] < f['Upper_BB'])
+    buy = (f['HA_Low'].shift(1) <= f['Lower_BB'].shift(1)) & (f['HA_Close'] > f['HA_Open']) & (f['HA_Low'] > f['Lower_BB'])
+    return _side(short, buy)
+
+
+@strategy("HA_BB_REVERSAL_1H", "CRYPTO", HA_BB, "1h", 15, buffer=lambda candle: candle['Close'] * 0.001, time_format='%d %b, %H:%M')
+def ha_bb_reversal(f):
+    """HA candle pierced a band, then the next one is back inside it."""
+    short = (f['HA_High'].shift(1) >= f['Upper_BB'].shift(1)) & (f['HA_High'] < f['Upper_BB'])
+    buy = (f['HA_Low'].shift(1) <= f['Lower_BB'].shift(1)) & (f['HA_Low'] > f['Lower_BB'])
+    return _side(short, buy)
+
+
+@strategy("TREND_3_FADE", "ANY", ("Trend_3",), "1d", None, buffer=lambda candle: 0.0, time_format='%Y-%m-%d', min_bars=3)
+def trend_3_fade(f):
+    """Fade three same-coloured candles: SHORT after three green, BUY after three red."""
+    return -f['Trend_3']
+
+
+def latest_signal(strat, frame, sentiment="BOTH"):
+    """The strategy's signal at the last completed bar (the one before the forming bar), or None."""
+    if len(frame) < strat.min_bars: return None
+    if any(frame[n].iloc[-3:-1].isna().any() for n in strat.needs): return None
+    side = int(frame[strat.name].iloc[-2])
+    if side == 0: return None
+    signal = "BUY" if side > 0 else "SHORT"
+    if sentiment == "BULLISH" and signal == "SHORT": return None
+    if sentiment == "BEARISH" and signal == "BUY": return None
+    candle = frame.row(-2, 'Open', 'High', 'Low', 'Close', 'Upper_BB', 'Lower_BB')
+    buffer = strat.buffer(candle)
+    if signal == "SHORT": entry, sl, target_bb = candle['Low'] - buffer, candle['High'] + buffer, candle['Lower_BB']
+    else: entry, sl, target_bb = candle['High'] + buffer, candle['Low'] - buffer, candle['Upper_BB']
+    risk = abs(entry - sl)
+    if risk <= 0: return None
+    return {"Signal": signal, "Entry": float(entry), "LTP": float(frame['Close'].iloc[-1]), "SL": float(sl), "Target(BB)": float(target_bb),
+            "T2(1:3)": float(entry - (risk*3) if signal == "SHORT" else entry + (risk*3)),
+            "Time": frame.index[-2].strftime(strat.time_format)}
+
+
+def backtest(strat, frame):
+    """Enter at the open of the bar after each signal, exit at its close; one row per trade."""
+    side = frame[strat.name].shift(1, fill_value=0)
+    opens, closes = frame['Open'], frame['Close']
+    taken = (side != 0) & (opens > 0)
+    pnl = side * (closes - opens) / opens * 100
+    return pd.DataFrame({"Signal": side[taken].map({1: "BUY", -1: "SHORT"}), "Entry": opens[taken], "Exit": closes[taken], "P&L %": pnl[taken].round(2)})
@@ -0,0 +1,250 @@
+"""Server-side auto-trade tracking driven by the signal bus.
+
+The trade book is shared by every browser session and by the background
+signal monitor, so trades are triggered and closed even when nobody has
+MAIN TERMINAL open.
+"""
+import datetime
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+import pytz
+
+from signal_bus import TOPIC_JOURNAL, TOPIC_SCAN, TOPIC_SIGNAL, TOPIC_TRADE_CLOSE, TOPIC_TRADE_OPEN
+
+logger = logging.getLogger(__name__)
+
+
+def load_data(file_name):
+    if os.path.exists(file_name):
+        try: return pd.read_csv(file_name).to_dict('records')
+        except: return []
+    return []
+
+def save_data(data, file_name):
+    pd.DataFrame(data).to_csv(file_name, index=False)
+
+def append_data(record, file_name, columns):
+    """Append one row under the file's existing header; False if `record` brings a new column."""
+    if not os.path.exists(file_name) or not columns or not set(record) <= set(columns): return False
+    pd.DataFrame([record], columns=columns).to_csv(file_name, mode="a", header=False, index=False)
+    return True
+
+def ist_now_str():
+    return datetime.datetime.now(pytz.timezone('Asia/Kolkata')).strftime("%Y-%m-%d %H:%M")
+
+
+class TradeBook:
+    """Active trades and closed-trade history, persisted to CSV.
+
+    `version` increases on every change so readers can cache derived views.
+    """
+
+    def __init__(self, active_file, history_file):
+        self.active_file = active_file
+        self.history_file = history_file
+        self.lock = threading.RLock()
+        self.active = load_data(active_file)
+        self.history = load_data(history_file)
+        self.history_columns = list(dict.fromkeys(k for r in self.history for k in r))
+        self.version = 0
+
+    def open_trade(self, trade):
+        with self.lock:
+            if any(t['Stock'] == trade['Stock'] for t in self.active): return False
+            self.active.append(trade)
+            self.version += 1
+            save_data(self.active, self.active_file)
+            return True
+
+    def remove_active(self, trade):
+        with self.lock:
+            if not any(t is trade for t in self.active): return False
+            self.active = [t for t in self.active if t is not trade]
+            self.version += 1
+            save_data(self.active, self.active_file)
+            return True
+
+    def append_history(self, record):
+        with self.lock:
+            self.history.append(record)
+            self.version += 1
+            # One row per trade; the file is only rewritten when a record adds a column
+            if not append_data(record, self.history_file, self.history_columns):
+                self.history_columns = list(dict.fromkeys(k for r in self.history for k in r))
+                save_data(self.history, self.history_file)
+
+    def clear(self):
+        with self.lock:
+            self.active, self.history, self.history_columns = [], [], []
+            self.version += 1
+            if os.path.exists(self.active_file): os.remove(self.active_file)
+            if os.path.exists(self.history_file): os.remove(self.history_file)
+
+
+class TradeTracker:
+    """Turns signals into trades and quotes into SL/target exits.
+
+    Subscribes to TOPIC_SCAN to keep the pending-signal table current and
+    publishes TOPIC_TRADE_OPEN / TOPIC_TRADE_CLOSE. Closed trades are written
+    to the journal by the TOPIC_TRADE_CLOSE subscriber, not here.
+
+    `touch(symbol)` -> (best bid, best ask) or None. Where it answers, entries
+    trigger and fill on the side a market order would hit (BUY at the ask,
+    SHORT at the bid) and stops exit there too, so spread and gaps past the
+    SL show up in P&L; elsewhere fills are at the exact levels off the LTP.
+    """
+
+    def __init__(self, bus, book, touch=None):
+        self.bus = bus
+        self.book = book
+        self.touch = touch
+        self.pending = {}
+        self._lock = threading.Lock()
+        bus.subscribe(TOPIC_SCAN, self.on_scan)
+        bus.subscribe(TOPIC_TRADE_CLOSE, self.on_close)
+
+    def on_scan(self, event):
+        scan = event['payload']
+        with self._lock:
+            self.pending = {k: v for k, v in self.pending.items() if v[0] != scan['watch']}
+            for sig in scan['signals']: self.pending[sig['Stock']] = (scan['watch'], sig)
+        for sig in scan['signals']: self.check_entry(sig, sig['LTP'])
+
+    def _touch(self, symbol):
+        if self.touch is None: return None
+        try: return self.touch(symbol)
+        except Exception: return None
+
+    def check_entry(self, sig, ltp):
+        if ltp == 0.0: return
+        touch = self._touch(sig['Stock'])
+        price = (touch[1] if sig['Signal'] == 'BUY' else touch[0]) if touch else ltp
+        is_triggered = False
+        if sig['Signal'] == 'BUY' and price >= sig['Entry']: is_triggered = True
+        elif sig['Signal'] == 'SHORT' and price <= sig['Entry']: is_triggered = True
+        if not is_triggered: return
+        new_trade = {
+            "Date": ist_now_str(), "Stock": sig['Stock'], "Signal": sig['Signal'],
+            "Entry": float(price if touch else sig['Entry']), "SL": float(sig['SL']), "Target": float(sig['T2(1:3)']), "Status": "RUNNING"
+        }
+        if self.book.open_trade(new_trade):
+            self.bus.publish(TOPIC_TRADE_OPEN, new_trade)
+
+    def on_quotes(self, quote_fn):
+        with self._lock: pending = [v[1] for v in self.pending.values()]
+        for sig in pending:
+            try: self.check_entry(sig, quote_fn(sig['Stock']))
+            except Exception: logger.exception("Entry check failed for %s", sig['Stock'])
+
+        with self.book.lock: active = list(self.book.active)
+        for trade in active:
+            try: ltp = quote_fn(trade['Stock'])
+            except Exception: continue
+            if ltp == 0.0: continue
+
+            # A long exits into the bid, a short into the ask; stops fill there, targets rest at their level
+            touch = self._touch(trade['Stock'])
+            price = (touch[0] if trade['Signal'] == 'BUY' else touch[1]) if touch else ltp
+            close_reason = None
+            exit_price = 0.0
+            if trade['Signal'] == 'BUY':
+                if price <= float(trade['SL']): close_reason, exit_price = "🛑 SL HIT", price if touch else trade['SL']
+                elif price >= float(trade['Target']): close_reason, exit_price = "🎯 TARGET HIT", trade['Target']
+            elif trade['Signal'] == 'SHORT':
+                if price >= float(trade['SL']): close_reason, exit_price = "🛑 SL HIT", price if touch else trade['SL']
+                elif price <= float(trade['Target']): close_reason, exit_price = "🎯 TARGET HIT", trade['Target']
+
+            if close_reason and self.book.remove_active(trade):
+                entry = float(trade['Entry'])
+                pnl_pct = ((exit_price - entry) / entry) * 100 if trade['Signal'] == 'BUY' else ((entry - exit_price) / entry) * 100
+                self.bus.publish(TOPIC_TRADE_CLOSE, {
+                    "Date": ist_now_str(), "Stock": trade['Stock'], "Signal": trade['Signal'],
+                    "Entry": entry, "Exit": float(exit_price), "Status": close_reason, "P&L %": round(pnl_pct, 2)
+                })
+
+    def on_close(self, event):
+        with self._lock: self.pending.pop(event['payload']['Stock'], None)
+
+
+class Journal:
+    """Appends every closed or manually logged trade to the trade history
+    and brings the journal analytics, if any, up to date with it."""
+
+    def __init__(self, bus, book, analytics=None):
+        self.book = book
+        self.analytics = analytics
+        bus.subscribe(TOPIC_TRADE_CLOSE, self.record)
+        bus.subscribe(TOPIC_JOURNAL, self.record)
+
+    def record(self, event):
+        with self.book.lock:
+            self.book.append_history(event['payload'])
+            if self.analytics is not None: self.analytics.sync(self.book.history)
+
+
+class SignalMonitor:
+    """Background loop that scans registered watchlists and polls quotes.
+
+    Each watch is `(key, scan_fn)`; `scan_fn()` returns the strategy's list
+    of signals and `key` must identify everything the scan depends on. Scans
+    run every `scan_interval` seconds and quote checks every `quote_interval`
+    seconds, independent of any open browser. Calling `watch()` again is the
+    heartbeat; a watch not renewed for `watch_ttl` seconds is dropped along
+    with its pending signals.
+    """
+
+    def __init__(self, bus, tracker, quote_fn, scan_interval=60, quote_interval=15, watch_ttl=1800):
+        self.bus = bus
+        self.tracker = tracker
+        self.quote_fn = quote_fn
+        self.scan_interval = scan_interval
+        self.quote_interval = quote_interval
+        self.watch_ttl = watch_ttl
+        self.watches = {}
+        self._seen = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, key, scan_fn):
+        with self._lock: self.watches[key] = (scan_fn, time.monotonic())
+
+    def expire(self):
+        cutoff = time.monotonic() - self.watch_ttl
+        with self._lock:
+            expired = [key for key, (_, seen) in self.watches.items() if seen < cutoff]
+            for key in expired: del self.watches[key]
+        for key in expired: self.bus.publish(TOPIC_SCAN, {"watch": key, "signals": []})
+        return expired
+
+    def ingest(self, key, signals):
+        for sig in signals:
+            sig_id = (sig['Stock'], sig['Signal'], sig['Time'])
+            with self._lock:
+                if sig_id in self._seen: continue
+                self._seen[sig_id] = True
+                if len(self._seen) > 5000: self._seen.pop(next(iter(self._seen)))
+            self.bus.publish(TOPIC_SIGNAL, sig)
+        self.bus.publish(TOPIC_SCAN, {"watch": key, "signals": list(signals)})
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="signal-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        last_scan = 0.0
+        while True:
+            if time.monotonic() - last_scan >= self.scan_interval:
+                last_scan = time.monotonic()
+                self.expire()
+                with self._lock: watches = [(key, scan_fn) for key, (scan_fn, _) in self.watches.items()]
+                for key, scan_fn in watches:
+                    try: self.ingest(key, scan_fn())
+                    except Exception: logger.exception("Background scan failed for %s", key)
+            self.tracker.on_quotes(self.quote_fn)
+            time.sleep(self.quote_interval)
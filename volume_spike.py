@@ -0,0 +1,133 @@
+"""Streaming volume-anomaly detector for the 9:20 AM OI Setup scanner.
+
+Keeps rolling per-symbol volume statistics bucketed by time of day, so the
+9:15 opening bar is compared with earlier 9:15 bars and not with a quiet
+lunchtime bar. Bars are fed one at a time as they close and a spike event is
+produced straight from that state; nothing is re-downloaded or re-scanned.
+"""
+import math
+import threading
+from collections import deque
+
+
+class _SlotStats:
+    __slots__ = ("values", "total", "total_sq")
+
+    def __init__(self, window):
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value):
+        if len(self.values) == self.values.maxlen:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    def mean(self):
+        return self.total / len(self.values) if self.values else 0.0
+
+    def std(self):
+        n = len(self.values)
+        if n < 2: return 0.0
+        var = (self.total_sq - (self.total * self.total) / n) / (n - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class _SymbolState:
+    __slots__ = ("slots", "last_time", "closes", "prev_volume", "last_event")
+
+    def __init__(self):
+        self.slots = {}
+        self.last_time = None
+        self.closes = deque(maxlen=3)
+        self.prev_volume = None
+        self.last_event = None
+
+
+class VolumeSpikeDetector:
+    """Per-symbol rolling volume mean/sigma keyed by time-of-day slot.
+
+    `update()` must be called once per closed bar, oldest first. A bar is a
+    spike when its volume is `z_threshold` sigmas above the mean of the same
+    slot on previous days and at least `ratio` times that mean. Until a slot
+    has `min_samples` days of history the old bar-over-bar rule is used.
+    """
+
+    def __init__(self, bar_minutes=15, window=20, z_threshold=2.0, ratio=1.5, min_samples=3):
+        self.bar_minutes = bar_minutes
+        self.window = window
+        self.z_threshold = z_threshold
+        self.ratio = ratio
+        self.min_samples = min_samples
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def is_warm(self, symbol):
+        with self._lock:
+            state = self._states.get(symbol)
+            return state is not None and state.last_time is not None
+
+    def last_bar_time(self, symbol):
+        with self._lock:
+            state = self._states.get(symbol)
+            return state.last_time if state else None
+
+    def sessions_needed(self, symbol, today, max_days):
+        """How many recent days of bars to feed so none since the last ingested bar is skipped.
+
+        A symbol left idle for longer than `max_days` is reset and re-warmed,
+        so its baseline never spans a hole.
+        """
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None or state.last_time is None: return max_days
+            gap = (today - state.last_time.date()).days + 1
+            if gap <= max_days: return gap
+            del self._states[symbol]
+            return max_days
+
+    def update(self, symbol, bar_time, close, volume):
+        close, volume = float(close), float(volume)
+        with self._lock:
+            state = self._states.setdefault(symbol, _SymbolState())
+            if state.last_time is not None and bar_time <= state.last_time: return None
+
+            slot_key = (bar_time.hour * 60 + bar_time.minute) // self.bar_minutes
+            stats = state.slots.get(slot_key)
+            if stats is None: stats = state.slots[slot_key] = _SlotStats(self.window)
+
+            event = None
+            if volume > 0 and len(state.closes) >= 2:
+                mean, sigma = stats.mean(), stats.std()
+                if len(stats.values) >= self.min_samples:
+                    z = (volume - mean) / sigma if sigma > 0 else None
+                    is_spike = volume >= mean * self.ratio and (z is None or z >= self.z_threshold)
+                else:
+                    z = None
+                    is_spike = state.prev_volume is not None and volume > state.prev_volume * self.ratio
+                if is_spike: event = self._classify(symbol, bar_time, close, volume, z, state.closes)
+
+            if volume > 0: stats.push(volume)
+            state.closes.append(close)
+            state.prev_volume = volume
+            state.last_time = bar_time
+            state.last_event = event
+            return event
+
+    def latest(self, symbol):
+        """Spike event for the most recently closed bar, or None."""
+        with self._lock:
+            state = self._states.get(symbol)
+            return state.last_event if state else None
+
+    def _classify(self, symbol, bar_time, close, volume, z, closes):
+        c2, c3 = closes[-1], closes[-2]
+        oi_status = "🔥 High (Spike)" if z is None else f"🔥 High (Spike {z:.1f}σ)"
+        if close > c2: signal, color = "Short Covering 🚀", "green"
+        else: signal, color = ("Long Unwinding ⚠️" if c2 > c3 else "Short Buildup 📉"), "red"
+        return {"Stock": symbol, "Signal": signal, "OI": oi_status, "Color": color,
+                "Volume": volume, "Z": z, "Time": bar_time.strftime('%H:%M')}